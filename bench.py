@@ -0,0 +1,168 @@
+'''Tool-level benchmark for the BaseballApi MCP server.
+
+Drives every tool through the MCP protocol at a configurable concurrency and reports throughput,
+p50/p95/p99 latency per tool, upstream request counts and peak memory. Run it against the replay.py
+stand-in so no RapidAPI quota is spent:
+
+    python replay.py fixtures/ --port 8765 --latency 80 &
+    python bench.py --upstream http://127.0.0.1:8765 --concurrency 16 --rounds 20
+
+By default the server runs in-process behind an in-memory MCP transport; --stdio spawns `python server.py`
+as a subprocess instead, the way MCP clients launch it, and --url drives a server already running with
+the HTTP transport (e.g. several workers).
+'''
+import argparse
+import asyncio
+import json
+import os
+import re
+import resource
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+
+# Arguments for required parameters whose description carries no "Default:" value.
+SAMPLE_ARGUMENTS = {
+    'term': 'yankees',
+    'page': 0,
+    'customId': 'ExbsIxb',
+    'ids': [9864379],
+    'source': 'team_last',
+    'start': '2022-08-01',
+    'end': '2022-08-03',
+    'stat': 'ops',
+    'id': 9864379,
+    'tournamentId': 11205,
+    'seasonId': 29168,
+}
+
+
+def sample_arguments(tool) -> dict:
+    schema = tool.inputSchema or {}
+    args = {}
+    for name in schema.get('required', []):
+        prop = schema.get('properties', {}).get(name, {})
+        match = re.search(r'Default: (-?\d+)', prop.get('description', ''))
+        if match:
+            args[name] = int(match.group(1))
+        elif name in SAMPLE_ARGUMENTS:
+            args[name] = SAMPLE_ARGUMENTS[name]
+    return args
+
+
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+async def upstream_stats(upstream: str):
+    if not upstream:
+        return None
+    try:
+        async with httpx.AsyncClient() as client:
+            return (await client.get(upstream.rstrip('/') + '/__stats')).json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def run(args) -> dict:
+    from fastmcp import Client
+    if args.url:
+        target = args.url
+    elif args.stdio:
+        from fastmcp.client.transports import PythonStdioTransport
+        env = {k: v for k, v in os.environ.items()}
+        target = PythonStdioTransport(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py'), env=env)
+    else:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import server
+        target = server.mcp
+    before = await upstream_stats(args.upstream)
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    async with Client(target, timeout=args.timeout) as client:
+        tools = [t for t in await client.list_tools()
+                 if (not args.tools or t.name in args.tools) and t.name not in args.exclude]
+        work = asyncio.Queue()
+        for _ in range(args.rounds):
+            for tool in tools:
+                work.put_nowait((tool.name, sample_arguments(tool)))
+
+        async def worker():
+            while not work.empty():
+                name, arguments = work.get_nowait()
+                started = time.perf_counter()
+                try:
+                    result = await client.call_tool(name, arguments, raise_on_error=False)
+                    if result.is_error:
+                        errors[name] += 1
+                except Exception:
+                    errors[name] += 1
+                latencies[name].append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    after = await upstream_stats(args.upstream)
+    calls = sum(len(v) for v in latencies.values())
+    everything = [x for v in latencies.values() for x in v]
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if args.stdio else resource.RUSAGE_SELF)
+    if args.url:
+        usage = None
+    return {
+        'tools': {name: {'calls': len(values), 'errors': errors[name], 'p50_ms': percentile(values, 50),
+                         'p95_ms': percentile(values, 95), 'p99_ms': percentile(values, 99)}
+                  for name, values in sorted(latencies.items())},
+        'calls': calls,
+        'errors': sum(errors.values()),
+        'seconds': elapsed,
+        'throughput': calls / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(everything, 50),
+        'p95_ms': percentile(everything, 95),
+        'p99_ms': percentile(everything, 99),
+        'upstream_requests': None if before is None or after is None else after['requests'] - before['requests'],
+        'peak_rss_mb': None if usage is None else usage.ru_maxrss / 1024,
+    }
+
+
+def print_report(report: dict):
+    print(f"{'tool':<34} {'calls':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, row in report['tools'].items():
+        print(f"{name:<34} {row['calls']:>6} {row['errors']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+    print()
+    print(f"calls {report['calls']}, errors {report['errors']}, {report['seconds']:.2f}s, {report['throughput']:.1f} calls/s")
+    print(f"latency p50 {report['p50_ms']:.1f} ms, p95 {report['p95_ms']:.1f} ms, p99 {report['p99_ms']:.1f} ms")
+    rss = 'n/a' if report['peak_rss_mb'] is None else f"{report['peak_rss_mb']:.1f} MB"
+    print(f"upstream requests {report['upstream_requests']}, peak RSS {rss}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the BaseballApi MCP server tool by tool.')
+    parser.add_argument('--upstream', help='Base URL of a replay.py stand-in; sets BASEBALLAPI_UPSTREAM_URL.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Number of concurrent MCP callers.')
+    parser.add_argument('--rounds', type=int, default=10, help='How many times every tool is called.')
+    parser.add_argument('--tools', nargs='*', help='Only benchmark these tools.')
+    parser.add_argument('--exclude', nargs='*', default=[], help='Skip these tools.')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-call timeout in seconds.')
+    parser.add_argument('--stdio', action='store_true', help='Run the server as a stdio subprocess.')
+    parser.add_argument('--url', help='MCP endpoint of a running HTTP server, e.g. http://127.0.0.1:9997/mcp/.')
+    parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+    args = parser.parse_args()
+    if args.upstream:
+        os.environ['BASEBALLAPI_UPSTREAM_URL'] = args.upstream
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
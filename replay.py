@@ -0,0 +1,171 @@
+'''Local stand-in for the BaseballApi upstream that replays recorded fixtures.
+
+Record fixtures by running the server with BASEBALLAPI_RECORD_DIR set, then serve them with
+
+    python replay.py fixtures/ --port 8765 --latency 80 --jitter 40 --error-rate 0.01 --throttle-rate 0.02
+
+and point the server at it with BASEBALLAPI_UPSTREAM_URL=http://127.0.0.1:8765. Requests whose exact
+parameters were not recorded fall back to any fixture of the same path. GET /__stats returns request
+counts per path and per API key and POST /__reset clears them.
+
+The quota and --key-rate apply to every x-rapidapi-key separately, like RapidAPI plans do, so a pool of keys
+can be load tested: --key-rate 5 answers a key's sixth request within a second with 429, and --keys makes
+any other key fail with 403.
+'''
+import argparse
+import base64
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+def load_fixtures(directory: str):
+    exact, by_path = {}, {}
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith('.json'):
+            continue
+        with open(os.path.join(directory, name)) as f:
+            fixture = json.load(f)
+        fixture['body'] = base64.b64decode(fixture['body'])
+        exact[(fixture['path'], tuple(sorted(fixture['params'].items())))] = fixture
+        by_path.setdefault(fixture['path'], fixture)
+    return exact, by_path
+
+
+class ReplayState:
+    def __init__(self, args):
+        self.args = args
+        self.exact, self.by_path = load_fixtures(args.fixtures)
+        self.counts = Counter()
+        self.statuses = Counter()
+        self.quota_used = Counter()
+        self.keys = Counter()
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key: str) -> bool:
+        '''Spend one request of the key's per-second budget; False when it is used up.'''
+        if not self.args.key_rate:
+            return True
+        now = time.monotonic()
+        tokens, updated = self.buckets.get(key, (self.args.key_rate, now))
+        tokens = min(self.args.key_rate, tokens + (now - updated) * self.args.key_rate)
+        if tokens < 1:
+            self.buckets[key] = (tokens, now)
+            return False
+        self.buckets[key] = (tokens - 1, now)
+        return True
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'requests': sum(self.counts.values()), 'paths': dict(self.counts), 'statuses': dict(self.statuses),
+                    'keys': {k[-4:]: n for k, n in self.keys.items()}, 'fixtures': len(self.exact)}
+
+    def reset(self):
+        with self.lock:
+            self.counts.clear()
+            self.statuses.clear()
+            self.keys.clear()
+
+
+def make_handler(state: ReplayState):
+    args = state.args
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *a):
+            if args.verbose:
+                super().log_message(format, *a)
+
+        def send_body(self, status: int, body: bytes, headers: dict = None):
+            self.send_response(status)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header('content-length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            with state.lock:
+                state.statuses[status] += 1
+
+        def send_json(self, status: int, data, headers: dict = None):
+            self.send_body(status, json.dumps(data).encode(), {'content-type': 'application/json', **(headers or {})})
+
+        def do_POST(self):
+            if self.path == '/__reset':
+                state.reset()
+                return self.send_json(200, {'reset': True})
+            self.send_json(404, {'error': 'not found'})
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == '/__stats':
+                return self.send_json(200, state.stats())
+            key = self.headers.get('x-rapidapi-key', '')
+            with state.lock:
+                state.counts[url.path] += 1
+                state.keys[key] += 1
+                allowed = state.take(key)
+                if allowed:
+                    state.quota_used[key] += 1
+                remaining = max(args.quota - state.quota_used[key], 0) if args.quota else None
+            delay = max(0.0, random.gauss(args.latency, args.jitter)) / 1000 if args.jitter else args.latency / 1000
+            time.sleep(delay)
+            if args.keys and key not in args.keys:
+                return self.send_json(403, {'message': 'You are not subscribed to this API.'})
+            headers = {}
+            if not allowed:
+                return self.send_json(429, {'message': 'Too many requests'}, {'retry-after': '1'})
+            if remaining is not None:
+                headers = {'x-ratelimit-requests-limit': str(args.quota), 'x-ratelimit-requests-remaining': str(remaining),
+                           'x-ratelimit-requests-reset': '3600'}
+                if remaining == 0:
+                    return self.send_json(429, {'message': 'You have exceeded the MONTHLY quota'}, headers)
+            roll = random.random()
+            if roll < args.throttle_rate:
+                return self.send_json(429, {'message': 'Too many requests'}, {'retry-after': '1', **headers})
+            if roll < args.throttle_rate + args.error_rate:
+                return self.send_json(503, {'message': 'Injected upstream error'}, headers)
+            params = tuple(sorted(parse_qsl(url.query)))
+            fixture = state.exact.get((url.path, params)) or state.by_path.get(url.path)
+            if fixture is None:
+                return self.send_json(404, {'error': f'no fixture for {url.path}'}, headers)
+            etag = fixture['headers'].get('etag')
+            if etag and self.headers.get('if-none-match') == etag:
+                return self.send_body(304, b'', {'etag': etag, **headers})
+            self.send_body(fixture['status'], fixture['body'], {**fixture['headers'], **headers})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded BaseballApi responses with configurable latency and faults.')
+    parser.add_argument('fixtures', help='Directory of fixtures written with BASEBALLAPI_RECORD_DIR.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=50, help='Mean response latency in milliseconds.')
+    parser.add_argument('--jitter', type=float, default=0, help='Standard deviation of the latency in milliseconds.')
+    parser.add_argument('--error-rate', type=float, default=0, help='Fraction of requests answered with 503.')
+    parser.add_argument('--throttle-rate', type=float, default=0, help='Fraction of requests answered with 429.')
+    parser.add_argument('--quota', type=int, default=0, help='Monthly quota per key to simulate with rate-limit headers (0: off).')
+    parser.add_argument('--key-rate', type=float, default=0, help='Requests per second allowed per key before 429s (0: off).')
+    parser.add_argument('--keys', nargs='*', help='Only accept these keys and answer any other with 403.')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+    state = ReplayState(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    print(f'replaying {len(state.exact)} fixtures on http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -1,593 +1,2820 @@
-import requests
-from datetime import datetime
+import httpx
+import sys
+from array import array
+from datetime import date, datetime, timedelta, timezone
 from typing import Union, Literal, List
-from mcp.server import FastMCP
 from pydantic import Field
 from typing import Annotated
-from mcp.server.fastmcp import FastMCP
 from fastmcp import FastMCP, Context
+from fastmcp.server.middleware import Middleware
+from fastmcp.utilities.types import Image
+from starlette.responses import PlainTextResponse
+import uvicorn
 import os
+import threading
+import traceback
+import base64
+import bisect
+import unicodedata
+import re
+import functools
+import inspect
+import operator
+import string
+import urllib.parse
+import io
+import hashlib
+import heapq
+import random
+import itertools
+import math
+import contextvars
+import concurrent.futures
+import json
+import sqlite3
+import tempfile
+import time
+from collections import Counter, OrderedDict, defaultdict, deque
+import asyncio
+import importlib.util
 from dotenv import load_dotenv
+try:
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
+np = None
 load_dotenv()
 rapid_api_key = os.getenv("RAPID_API_KEY")
 
+def _load_keys() -> list:
+    '''RapidAPI keys from RAPID_API_KEY, the comma or whitespace separated RAPID_API_KEYS and RAPID_API_KEY_FILE
+    (one key per line, # starts a comment), in that order and without duplicates.'''
+    keys = [rapid_api_key or '']
+    keys += re.split(r'[\s,]+', os.getenv('RAPID_API_KEYS', ''))
+    path = os.getenv('RAPID_API_KEY_FILE')
+    if path:
+        with open(path) as f:
+            keys += [line.split('#', 1)[0].strip() for line in f]
+    keys = list(dict.fromkeys(k for k in keys if k))
+    return keys or ['']
+
 __rapidapi_url__ = 'https://rapidapi.com/fluis.lacasse/api/baseballapi'
 
-mcp = FastMCP('baseballapi')
+_upstream_host = 'https://baseballapi.p.rapidapi.com'
+_upstream_url = os.getenv('BASEBALLAPI_UPSTREAM_URL', _upstream_host).rstrip('/')
+_record_dir = os.getenv('BASEBALLAPI_RECORD_DIR')
+_connect_timeout = float(os.getenv('BASEBALLAPI_CONNECT_TIMEOUT', '5'))
+_read_timeout = float(os.getenv('BASEBALLAPI_READ_TIMEOUT', '20'))
+_max_connections = int(os.getenv('BASEBALLAPI_MAX_CONNECTIONS', '20'))
+_max_inflight = int(os.getenv('BASEBALLAPI_MAX_INFLIGHT', '10'))
+_http2 = os.getenv('BASEBALLAPI_HTTP2', '').lower() in ('1', 'true', 'yes') and importlib.util.find_spec('h2') is not None
 
-@mcp.tool()
-def search(term: Annotated[str, Field(description='The search term to use for finding baseball-related entities.')]) -> dict: 
-    '''Search for baseball-related entities using the provided search term, and filter the results to show only baseball-related entities.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/search/mlb'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'term': term,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def match_player_statistics(id: Annotated[Union[int, float], Field(description='The ID of the baseball match for which you want to get the player statistics. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                            playerId: Annotated[Union[int, float], Field(description='The player id. Default: 977489')]) -> dict: 
-    '''Get the statistics for a specific baseball player in the match by providing its ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/match/9864379/player/977489/statistics'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-        'playerId': playerId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def match_lineups(id: Annotated[Union[int, float], Field(description='The ID of the baseball match for which you want to get the lineups. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the lineups for a specific baseball match by providing its ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/match/9864379/lineups'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def match_statistics(id: Annotated[Union[int, float], Field(description='The ID of the baseball match for which you want to get the statistics. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the statistics for a specific baseball match by providing its ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/match/9864379/statistics'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def match_highlights(id: Annotated[Union[int, float], Field(description='The ID of the match for which you want to get highlights. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the highlights of a specific baseball match using the match ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/match/9864379/highlights'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def match_schedules(day: Annotated[Union[int, float], Field(description='The day of the month for which you want to retrieve the match schedules (1-31). Default: 1 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                    month: Annotated[Union[int, float], Field(description='The month for which you want to retrieve the match schedules (1-12). Default: 8 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                    year: Annotated[Union[int, float], Field(description='The year for which you want to retrieve the match schedules (e.g., 2022). Default: 2022 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''This operation returns the baseball match schedules for the given date, including match timings, teams, and other relevant information.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/matches/1/8/2022'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'day': day,
-        'month': month,
-        'year': year,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def match_details(id: Annotated[Union[int, float], Field(description='The ID of the match for which you want to get the details. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get detailed information for a specific baseball match by providing the match ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/match/9864379'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def live_matches() -> dict: 
-    '''Get live baseball matches that are currently taking place.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/matches/live'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def match_odds(id: Annotated[Union[int, float], Field(description='The ID of the match for which you want to get the odds. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the odds for a specific baseball match using the match ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/match/9864379/odds'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def match_h2_hduel(id: Annotated[Union[int, float], Field(description='The ID of the match for which you want to get the head-to-head duel. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the head-to-head duel for a specific baseball match using the match ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/match/9864379/duel'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def match_votes(id: Annotated[Union[int, float], Field(description='The ID of the match for which you want to get the votes. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the votes for a specific baseball match using the match ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/match/9864379/votes'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def head_to_head_matches(customId: Annotated[str, Field(description='The custom ID of the match for which you want to get the head-to-head matches.')]) -> dict: 
-    '''Get head-to-head match data for a specific baseball match using its custom ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/match/ExbsIxb/h2h'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'customId': customId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def pre_match_form(id: Annotated[Union[int, float], Field(description='The ID of the match for which you want to get the pre-match form. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the pre-match form for a specific baseball match using the match ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/match/9864379/form'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def player_near_matches(id: Annotated[Union[int, float], Field(description='The player ID for which you want to retrieve the near matches. Default: 977489 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the near matches for a specific baseball player using the player ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/player/977489/matches/near'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def player_regular_season_statistics(id: Annotated[Union[int, float], Field(description='The player ID for which you want to retrieve the statistics. Default: 977489 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                                     tournamentId: Annotated[Union[int, float], Field(description="The unique tournament ID for which you want to retrieve the player's statistics. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000")],
-                                     seasonId: Annotated[Union[int, float], Field(description="The season ID for which you want to retrieve the player's statistics. Default: 29168 Minimum: -9223372036854776000 Maximum: 9223372036854776000")]) -> dict: 
-    '''Get the regular season statistics for a specific baseball player using the player ID, tournament ID, and season ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/player/977489/tournament/11205/season/29168/statistics/regularSeason'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-        'tournamentId': tournamentId,
-        'seasonId': seasonId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def player_statistics_seasons(id: Annotated[Union[int, float], Field(description='The player ID for which you want to retrieve the statistics seasons. Default: 977489 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the statistics seasons for a specific baseball player using the player ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/player/977489/statistics/seasons'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def player_last_matches(id: Annotated[Union[int, float], Field(description='The ID of the player for which you want to retrieve the last matches. Default: 1195558 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                        page: Annotated[Union[int, float], Field(description='Zero-based page number. Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the last matches played by a specific Baseball player by providing the player ID and page number.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/player/1195558/matches/previous/%7Bpage%7D'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-        'page': page,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def player_image(id: Annotated[Union[int, float], Field(description='The player ID for which you want to retrieve the image. Default: 977489 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the image for a specific baseball player using the player ID. Generates a PNG image.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/player/977489/image'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def player_details(id: Annotated[Union[int, float], Field(description='The player ID for which you want to retrieve the details. Default: 977489 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the details for a specific baseball player using the player ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/player/977489'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def team_standings_seasons(id: Annotated[Union[int, float], Field(description='The ID of the team for which you want to retrieve the team standings for different seasons. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the team standings for different seasons for a given team by providing its ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/team/3633/standings/seasons'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def team_tournaments(id: Annotated[Union[int, float], Field(description='The ID of the team for which you want to retrieve the tournaments. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the tournaments in which a specific baseball team participates.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/team/3633/tournaments'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def team_logo_image(id: Annotated[Union[int, float], Field(description='The team ID for which you want to retrieve the logo image. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the logo image for a specific baseball team using the team ID. Generates a PNG image.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/team/3633/image'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def team_next_matches(id: Annotated[Union[int, float], Field(description='The ID of the team for which you want to retrieve upcoming matches. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                      page: Annotated[Union[int, float], Field(description='The page number (zero-based) of the results you want to retrieve. Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get upcoming baseball matches for a specific team.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/team/3633/matches/next/%7Bpage%7D'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-        'page': page,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def team_details(id: Annotated[Union[int, float], Field(description='The team ID for which you want to retrieve the details. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the details for a specific baseball team using the team ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/team/3633'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def team_near_matches(id: Annotated[Union[int, float], Field(description='The team ID for which you want to retrieve the near matches. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the near matches for a specific baseball team using the team ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/team/3633/matches/near'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def team_last_matches(id: Annotated[Union[int, float], Field(description='The ID of the baseball team for which you want to retrieve the last matches. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                      page: Annotated[Union[int, float], Field(description='The zero-based page number of the results you want to retrieve. Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the last matches for a specific baseball team by providing its ID and page number.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/team/3633/matches/previous/%7Bpage%7D'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-        'page': page,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def team_media(id: Annotated[Union[int, float], Field(description='The team ID for which you want to retrieve the media. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the media for a specific baseball team using the team ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/team/3633/media'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def team_players(id: Annotated[Union[int, float], Field(description='The team ID for which you want to retrieve the players. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the players for a specific baseball team using the team ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/team/3633/players'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_away_standings(tournamentId: Annotated[Union[int, float], Field(description='The unique tournament ID for which you want to retrieve the away standings. Default: 19442 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                          seasonId: Annotated[Union[int, float], Field(description='The ID of the season for which you want to retrieve the away standings. Default: 49349 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the away standings of a specific baseball league for a specific season.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/19442/season/49349/standings/away'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-        'seasonId': seasonId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_details(tournamentId: Annotated[Union[int, float], Field(description="The unique tournament ID for which you want to retrieve the league's details. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000")]) -> dict: 
-    '''Get the details of a specific baseball league using the unique tournament ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/11205'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_home_standings(tournamentId: Annotated[Union[int, float], Field(description='The unique tournament ID for which you want to retrieve the home standings. Default: 19442 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                          seasonId: Annotated[Union[int, float], Field(description='The ID of the season for which you want to retrieve the home standings. Default: 49349 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the home standings of a specific baseball league for a specific season.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/19442/season/49349/standings/home'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-        'seasonId': seasonId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_total_standings(tournamentId: Annotated[Union[int, float], Field(description='The unique tournament ID for which you want to retrieve the total standings. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                           seasonId: Annotated[Union[int, float], Field(description='The ID of the season for which you want to retrieve the total standings. Default: 29168 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the total standings of a specific baseball league for a specific season.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/11205/season/29168/standings/total'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-        'seasonId': seasonId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_next_matches(tournamentId: Annotated[Union[int, float], Field(description="The unique tournament ID for which you want to retrieve the league's next matches. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000")],
-                        seasonId: Annotated[Union[int, float], Field(description="The season ID for which you want to retrieve the league's next matches. Default: 39143 Minimum: -9223372036854776000 Maximum: 9223372036854776000")],
-                        page: Annotated[Union[int, float], Field(description='Zero-based page. Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the next matches for a specific baseball league using the tournament ID, season ID, and page.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/11205/season/39143/matches/next/%7Bpage%7D'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-        'seasonId': seasonId,
-        'page': page,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_media(tournamentId: Annotated[Union[int, float], Field(description='The unique tournament ID for which you want to retrieve the league media. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the media for a specific baseball league using the unique tournament ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/11205/media'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_total_team_events(tournamentId: Annotated[Union[int, float], Field(description='The unique tournament ID for which you want to retrieve the total team events. Default: 19442 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                             seasonId: Annotated[Union[int, float], Field(description='The ID of the season for which you want to retrieve the total team events. Default: 49349 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''This endpoint retrieves the last 5 matches for a specific league in a given season for both home and away events.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/19442/season/49349/team-events/total'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-        'seasonId': seasonId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_cup_trees(tournamentId: Annotated[Union[int, float], Field(description='The unique tournament ID for which you want to retrieve the league cup trees. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                     seasonId: Annotated[Union[int, float], Field(description='The season ID for which you want to retrieve the league cup trees. Default: 29168 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the cup trees for a specific baseball league using the tournament ID and season ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/11205/season/29168/cuptrees'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-        'seasonId': seasonId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def category_tournaments(id: Annotated[Union[int, float], Field(description='The category ID for which you want to retrieve all leagues. Default: 1374 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get a list of all leagues from a specific baseball category using the category ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/all/category/1374'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_away_team_events(tournamentId: Annotated[Union[int, float], Field(description='The unique tournament ID for which you want to retrieve the away team events. Default: 19442 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                            seasonId: Annotated[Union[int, float], Field(description='The ID of the season for which you want to retrieve the away team events. Default: 49349 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''This endpoint retrieves the last 5 matches for a specific league in a given season for away events.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/19442/season/49349/team-events/away'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-        'seasonId': seasonId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_seasons(tournamentId: Annotated[Union[int, float], Field(description="The unique tournament ID for which you want to retrieve the league's seasons. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000")]) -> dict: 
-    '''Get the seasons for a specific baseball league using the unique tournament ID.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/11205/seasons'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def category_schedules(id: Annotated[Union[int, float], Field(description='The category ID for which you want to retrieve the schedules. Default: 1374 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                       day: Annotated[Union[int, float], Field(description='The day for which you want to retrieve the schedules. Default: 1 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                       month: Annotated[Union[int, float], Field(description='The month for which you want to retrieve the schedules. Default: 8 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                       year: Annotated[Union[int, float], Field(description='The year for which you want to retrieve the schedules. Default: 2022 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the baseball match schedules for a specific day and category using the category ID, day, month, and year.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/category/1374/events/1/8/2022'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'id': id,
-        'day': day,
-        'month': month,
-        'year': year,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_logo_image(tournamentId: Annotated[Union[int, float], Field(description='The unique tournament ID for which you want to retrieve the league logo image. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the logo image for a specific baseball league using the unique tournament ID. Generates a PNG image.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/11205/image'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-    }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_last_matches(tournamentId: Annotated[Union[int, float], Field(description='The unique tournament ID for which you want to retrieve the last matches. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                        seasonId: Annotated[Union[int, float], Field(description='The season ID for which you want to retrieve the last matches. Default: 39143 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                        page: Annotated[Union[int, float], Field(description='The 0-based page number for which you want to retrieve the last matches. Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''Get the last matches for a league by providing the unique tournament ID, season ID, and the page number (0-based).'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/11205/season/39143/matches/last/%7Bpage%7D'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-        'seasonId': seasonId,
-        'page': page,
+def _make_client() -> httpx.AsyncClient:
+    '''Build the pooled keep-alive client shared by every tool. httpx negotiates gzip/deflate
+    itself and adds br/zstd when brotli/zstandard are installed; HTTP/2 needs the h2 extra.'''
+    return httpx.AsyncClient(
+        headers={'x-rapidapi-host': 'baseballapi.p.rapidapi.com'},
+        timeout=httpx.Timeout(_read_timeout, connect=_connect_timeout),
+        limits=httpx.Limits(max_connections=_max_connections, max_keepalive_connections=_max_connections, keepalive_expiry=60),
+        http2=_http2,
+    )
+
+_client = _make_client()
+_inflight = asyncio.Semaphore(_max_inflight)
+
+_duration_buckets = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_size_buckets = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Metric families: name -> (type, help, histogram buckets).
+_metric_families = {
+    'baseballapi_tool_duration_seconds': ('histogram', 'Tool call latency by phase (total, handler, serialize, queue, upstream, parse).', _duration_buckets),
+    'baseballapi_tool_response_bytes': ('histogram', 'Size of the serialized tool result.', _size_buckets),
+    'baseballapi_tool_calls': ('counter', 'Tool calls by outcome.', None),
+    'baseballapi_upstream_duration_seconds': ('histogram', 'Upstream HTTP request latency by endpoint.', _duration_buckets),
+    'baseballapi_upstream_response_bytes': ('histogram', 'Upstream response body size by endpoint.', _size_buckets),
+    'baseballapi_upstream_requests': ('counter', 'Upstream requests by endpoint and status code.', None),
+    'baseballapi_upstream_retries': ('counter', 'Upstream retries by endpoint.', None),
+    'baseballapi_cache_requests': ('counter', 'Response cache lookups by endpoint and result.', None),
+    'baseballapi_breaker_transitions': ('counter', 'Circuit breaker state changes by endpoint group and new state.', None),
+    'baseballapi_key_requests': ('counter', 'Upstream requests by API key of the pool and HTTP status.', None),
+}
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, buckets: tuple):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+def _label_key(labels: dict) -> tuple:
+    '''Sample key of a label set. Values are kept as strings, so keys mixing e.g. an HTTP status and an
+    exception name still sort.'''
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _label_value(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class _Metrics:
+    '''Process-wide counters, histograms and gauges rendered in the OpenMetrics text format.'''
+
+    def __init__(self, families: dict):
+        self.families = families
+        self._samples = {name: {} for name in families}
+        self._gauges = {}
+
+    def observe(self, name: str, value: float, **labels):
+        buckets = self.families[name][2]
+        key = _label_key(labels)
+        histogram = self._samples[name].get(key)
+        if histogram is None:
+            histogram = self._samples[name][key] = _Histogram(buckets)
+        histogram.counts[bisect.bisect_left(buckets, value)] += 1
+        histogram.sum += value
+        histogram.count += 1
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        samples = self._samples[name]
+        samples[key] = samples.get(key, 0) + value
+
+    def gauge(self, name: str, help: str, read):
+        self._gauges[name] = (help, read)
+
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help, buckets) in self.families.items():
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'# HELP {name} {help}')
+            for key, sample in sorted(self._samples[name].items()):
+                labels = ','.join(f'{k}="{_label_value(v)}"' for k, v in key)
+                if kind == 'counter':
+                    lines.append(f'{name}_total{{{labels}}} {sample}')
+                    continue
+                prefix = labels + ',' if labels else ''
+                cumulative = 0
+                for bound, count in zip(buckets + ('+Inf',), sample.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{labels}}} {sample.sum}')
+                lines.append(f'{name}_count{{{labels}}} {sample.count}')
+        for name, (help, read) in self._gauges.items():
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'# HELP {name} {help}')
+            lines.append(f'{name} {read()}')
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+_metrics = _Metrics(_metric_families)
+_upstream_in_flight = 0
+_metrics.gauge('baseballapi_upstream_in_flight', 'Upstream HTTP requests currently in flight.', lambda: _upstream_in_flight)
+
+# Per-call phase timings, filled in by the upstream layer while a tool call is running.
+_trace = contextvars.ContextVar('baseballapi_trace', default=None)
+_trace_log = os.getenv('BASEBALLAPI_TRACE_LOG')
+_trace_enabled = bool(_trace_log)
+
+
+# Freshness per endpoint class: live scoreboard/odds data, recent match and schedule data,
+# slowly changing reference data, and effectively static data such as categories and logos.
+_cache_ttl = {
+    'live': float(os.getenv('BASEBALLAPI_TTL_LIVE', '15')),
+    'recent': float(os.getenv('BASEBALLAPI_TTL_RECENT', '300')),
+    'reference': float(os.getenv('BASEBALLAPI_TTL_REFERENCE', '21600')),
+    'static': float(os.getenv('BASEBALLAPI_TTL_STATIC', '604800')),
+}
+
+class _ResponseCache:
+    '''In-process LRU cache of parsed upstream responses, bounded by entry count and body bytes.'''
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, key, max_stale: float = 0):
+        '''Return the entry for key, including one that expired at most max_stale seconds ago.'''
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and entry[0] + max_stale < now:
+            self._remove(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if entry[0] < now:
+            self.stale += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def fresh(self, key) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] >= time.monotonic()
+
+    def put(self, key, data, size: int, ttl: float, age: float = 0):
+        if self.max_entries <= 0 or ttl <= 0 or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        now = time.monotonic()
+        self._entries[key] = (now + ttl, size, data, now - age)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key):
+        self.bytes -= self._entries.pop(key)[1]
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale': self.stale,
+            'evictions': self.evictions,
+        }
+
+_cache = _ResponseCache(int(os.getenv('BASEBALLAPI_CACHE_MAX_ENTRIES', '2048')),
+                        int(os.getenv('BASEBALLAPI_CACHE_MAX_BYTES', str(64 * 1024 * 1024))))
+# Expired entries are served while they are refreshed in the background for this many TTLs past expiry, and
+# for up to _stale_if_error seconds while their endpoint group's circuit breaker is open or a refresh is slow.
+_stale_while_revalidate = float(os.getenv('BASEBALLAPI_STALE_WHILE_REVALIDATE', '1'))
+_stale_if_error = float(os.getenv('BASEBALLAPI_STALE_IF_ERROR', '86400'))
+_stale_deadline = float(os.getenv('BASEBALLAPI_STALE_DEADLINE', '2'))
+
+def _cache_key(url: str, payload: dict) -> tuple:
+    '''Normalize parameters so that e.g. id=5 and id=5.0 share an entry.'''
+    params = []
+    for k, v in sorted(payload.items()):
+        if isinstance(v, float) and v.is_integer():
+            v = int(v)
+        params.append((k, str(v)))
+    return (url, tuple(params))
+
+class _DiskStore:
+    '''SQLite-backed response store that survives restarts of the per-session stdio process and is shared by
+    HTTP worker processes, together with the upstream rate limit and quota state.
+    Rows without an expiry are immutable (e.g. data for finished matches) and are never refreshed; the others are
+    pruned once they are more than keep_stale seconds past expiry. Writes and the reads on the request path run on
+    one store thread, so a lock held by another process never blocks the event loop.'''
+
+    def __init__(self, path: str, keep_stale: float = 0, prune_interval: float = 300):
+        self.keep_stale = keep_stale
+        self.prune_interval = prune_interval
+        self._pruned_at = 0
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='baseballapi-store')
+        self._db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.execute('PRAGMA mmap_size=268435456')
+        self._db.execute('CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, body BLOB NOT NULL, '
+                         'stored_at REAL NOT NULL, expires_at REAL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS finished_matches (id INTEGER PRIMARY KEY)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS images (key TEXT PRIMARY KEY, entry TEXT NOT NULL)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS schedule_days (scope TEXT NOT NULL, day TEXT NOT NULL, '
+                         'columns TEXT NOT NULL, PRIMARY KEY (scope, day))')
+        self._db.execute('CREATE TABLE IF NOT EXISTS limits (name TEXT PRIMARY KEY, tokens REAL NOT NULL, '
+                         'updated REAL NOT NULL, paused_until REAL NOT NULL DEFAULT 0, quota_limit INTEGER, '
+                         'quota_remaining INTEGER, quota_reset_at REAL)')
+
+    async def run(self, fn, *args):
+        '''Run a store method on the store thread.'''
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def defer(self, fn, *args):
+        '''Queue a write on the store thread without waiting for it.'''
+        self._executor.submit(fn, *args)
+
+    def get(self, key: str, max_stale: float = 0):
+        row = self._db.execute('SELECT body, stored_at, expires_at FROM responses WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[2] is not None and row[2] + max_stale < time.time()):
+            return None
+        return row
+
+    def put(self, key: str, body: bytes, ttl: float = None):
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        self._db.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)', (key, body, now, expires_at))
+        if now - self._pruned_at >= self.prune_interval:
+            self.prune()
+
+    def prune(self) -> int:
+        '''Delete the rows too far past expiry to be served even while upstream is failing.'''
+        self._pruned_at = time.time()
+        return self._db.execute('DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at + ? < ?',
+                                (self.keep_stale, self._pruned_at)).rowcount
+
+    def is_finished(self, match_id: int) -> bool:
+        return self._db.execute('SELECT 1 FROM finished_matches WHERE id = ?', (match_id,)).fetchone() is not None
+
+    def mark_finished(self, match_id: int):
+        self._db.execute('INSERT OR IGNORE INTO finished_matches VALUES (?)', (match_id,))
+
+    def get_image(self, key: str):
+        row = self._db.execute('SELECT entry FROM images WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put_image(self, key: str, entry: dict):
+        self._db.execute('INSERT OR REPLACE INTO images VALUES (?, ?)', (key, json.dumps(entry)))
+
+    def get_schedule_day(self, scope: str, day: str):
+        row = self._db.execute('SELECT columns FROM schedule_days WHERE scope = ? AND day = ?', (scope, day)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put_schedule_day(self, scope: str, day: str, columns: dict):
+        self._db.execute('INSERT OR REPLACE INTO schedule_days VALUES (?, ?, ?)', (scope, day, json.dumps(columns)))
+
+    def take_token(self, rate: float, burst: float) -> float:
+        '''Take one token from the upstream bucket shared by every process using this store.
+        Returns 0 when a token was taken, otherwise the number of seconds to wait.'''
+        now = time.time()
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            row = self._db.execute("SELECT tokens, updated, paused_until FROM limits WHERE name = 'upstream'").fetchone()
+            tokens, updated, paused_until = row if row is not None else (burst, now, 0)
+            tokens = min(burst, tokens + max(0, now - updated) * rate) if rate > 0 else burst
+            delay = max(0, paused_until - now)
+            if tokens < 1:
+                delay = max(delay, (1 - tokens) / rate)
+            if delay == 0:
+                tokens -= 1
+            self._db.execute("INSERT INTO limits (name, tokens, updated) VALUES ('upstream', ?, ?) "
+                             'ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated',
+                             (tokens, now))
+            self._db.execute('COMMIT')
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        return delay
+
+    def put_limits(self, quota_limit, quota_remaining, quota_reset_at, paused_until: float = 0):
+        self._db.execute("INSERT INTO limits VALUES ('upstream', 0, 0, ?, ?, ?, ?) ON CONFLICT(name) DO UPDATE SET "
+                         'paused_until = MAX(paused_until, excluded.paused_until), '
+                         'quota_limit = COALESCE(excluded.quota_limit, quota_limit), '
+                         'quota_remaining = COALESCE(excluded.quota_remaining, quota_remaining), '
+                         'quota_reset_at = COALESCE(excluded.quota_reset_at, quota_reset_at)',
+                         (paused_until, quota_limit, quota_remaining, quota_reset_at))
+
+    def get_limits(self):
+        return self._db.execute('SELECT tokens, updated, paused_until, quota_limit, quota_remaining, quota_reset_at '
+                                "FROM limits WHERE name = 'upstream'").fetchone()
+
+    def stats(self) -> dict:
+        count, immutable, size = self._db.execute(
+            'SELECT COUNT(*), COUNT(*) - COUNT(expires_at), COALESCE(SUM(LENGTH(body)), 0) FROM responses').fetchone()
+        return {'entries': count, 'immutable': immutable, 'bytes': size}
+
+_cache_db = os.getenv('BASEBALLAPI_CACHE_DB')
+_store = _DiskStore(_cache_db, _stale_if_error) if _cache_db else None
+_workers = int(os.getenv('BASEBALLAPI_WORKERS', '1'))
+# Processes sharing the store also share every cached response and the upstream rate limit.
+_share_state = _store is not None and os.getenv(
+    'BASEBALLAPI_SHARE_STATE', '1' if _workers > 1 else '').lower() in ('1', 'true', 'yes')
+
+# Endpoint classes that are worth persisting across sessions; the final endpoints of a finished match are too.
+_persistent_classes = tuple(_cache_ttl) if _share_state else ('reference', 'static')
+_finished_matches = set()
+# Match endpoints whose data no longer changes once the match is finished. Highlights, votes, odds and
+# player statistics keep being published or corrected after the final out, so they keep their TTLs.
+_final_endpoints = ('match_details', 'match_lineups')
+
+def _is_finished(match_id) -> bool:
+    if match_id is None:
+        return False
+    if match_id in _finished_matches:
+        return True
+    if _store is not None and _store.is_finished(match_id):
+        _finished_matches.add(match_id)
+        return True
+    return False
+
+def _mark_finished(data):
+    '''Remember matches whose details report them as finished; their data no longer changes.'''
+    event = data.get('event') if isinstance(data, dict) else None
+    if not isinstance(event, dict) or 'id' not in event:
+        return
+    if (event.get('status') or {}).get('type') == 'finished':
+        _finished_matches.add(event['id'])
+        if _store is not None:
+            _store.defer(_store.mark_finished, event['id'])
+
+_entity_keys = {
+    'team': 'team', 'homeTeam': 'team', 'awayTeam': 'team', 'teams': 'team',
+    'player': 'player', 'players': 'player',
+    'uniqueTournament': 'uniqueTournament', 'uniqueTournaments': 'uniqueTournament',
+}
+
+def _normalize_name(name: str) -> str:
+    name = unicodedata.normalize('NFKD', name)
+    return ' '.join(''.join(c for c in name if not unicodedata.combining(c)).lower().split())
+
+def _trigrams(name: str) -> set:
+    padded = f'  {name} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class _EntityIndex:
+    '''Local index of teams, players and unique tournaments seen in upstream responses, used to answer
+    search without an upstream call. Name tokens are kept sorted for prefix lookups and names are
+    indexed by trigram for fuzzy matches.'''
+
+    def __init__(self):
+        self._entities = {}
+        self._names = {}
+        self._tokens = []
+        self._grams = defaultdict(set)
+
+    def __len__(self):
+        return len(self._entities)
+
+    def add(self, kind: str, entity: dict):
+        key = (kind, entity['id'])
+        name = _normalize_name(str(entity.get('name') or ''))
+        if not name:
+            return
+        self._entities[key] = {**self._entities.get(key, {}), **entity}
+        old = self._names.get(key)
+        if old == name:
+            return
+        if old is not None:
+            for token in set(old.split()) | {old}:
+                i = bisect.bisect_left(self._tokens, (token, kind, key[1]))
+                if i < len(self._tokens) and self._tokens[i] == (token, kind, key[1]):
+                    del self._tokens[i]
+            for gram in _trigrams(old):
+                self._grams[gram].discard(key)
+        self._names[key] = name
+        for token in set(name.split()) | {name}:
+            bisect.insort(self._tokens, (token, kind, key[1]))
+        for gram in _trigrams(name):
+            self._grams[gram].add(key)
+
+    def ingest(self, data, kind: str = None):
+        '''Walk a response and index every entity found under a known key.'''
+        if isinstance(data, list):
+            for item in data:
+                self.ingest(item, kind)
+        elif isinstance(data, dict):
+            if kind is not None and 'id' in data and 'name' in data:
+                self.add(kind, data)
+            if isinstance(data.get('entity'), dict) and data.get('type') in ('team', 'player', 'uniqueTournament'):
+                self.ingest(data['entity'], data['type'])
+            for k, v in data.items():
+                if isinstance(v, (dict, list)) and k != 'entity':
+                    self.ingest(v, _entity_keys.get(k))
+
+    def search(self, term: str, limit: int = 20) -> list:
+        query = _normalize_name(term)
+        if not query:
+            return []
+        scores = {}
+        i = bisect.bisect_left(self._tokens, (query,))
+        while i < len(self._tokens) and self._tokens[i][0].startswith(query):
+            token, kind, entity_id = self._tokens[i]
+            key = (kind, entity_id)
+            name = self._names[key]
+            score = 1.0 if name == query else 0.95 if name.startswith(query) else 0.92 if token == query else 0.9
+            scores[key] = max(scores.get(key, 0), score - 0.001 * min(len(name) - len(query), 40))
+            i += 1
+        grams = _trigrams(query)
+        shared = Counter(key for gram in grams for key in self._grams.get(gram, ()))
+        for key, count in shared.items():
+            similarity = count / (len(grams) + len(_trigrams(self._names[key])) - count)
+            scores[key] = max(scores.get(key, 0), 0.8 * similarity)
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [{'entity': self._entities[key], 'score': round(score, 4), 'type': key[0]} for key, score in ranked]
+
+_entities = _EntityIndex()
+_search_min_score = float(os.getenv('BASEBALLAPI_SEARCH_MIN_SCORE', '0.85'))
+_search_min_length = int(os.getenv('BASEBALLAPI_SEARCH_MIN_LENGTH', '3'))
+
+class _MatchRecord:
+    '''One match, reduced to the fields needed for head-to-head, form and near-match answers.'''
+    __slots__ = ('id', 'custom_id', 'start', 'home', 'away', 'home_name', 'away_name', 'home_score', 'away_score',
+                 'status', 'winner', 'tournament', 'season')
+
+    def event(self) -> dict:
+        '''The record in the shape of an upstream event.'''
+        return {
+            'id': self.id,
+            'customId': self.custom_id,
+            'startTimestamp': self.start,
+            'status': {'type': self.status},
+            'winnerCode': self.winner,
+            'homeTeam': {'id': self.home, 'name': self.home_name},
+            'awayTeam': {'id': self.away, 'name': self.away_name},
+            'homeScore': {'current': self.home_score},
+            'awayScore': {'current': self.away_score},
+            'tournament': {'uniqueTournament': {'id': self.tournament}},
+            'season': {'id': self.season},
+        }
+
+    def result(self, team: int) -> str:
+        '''W, L or D from the point of view of one of the teams.'''
+        if self.winner == 3:
+            return 'D'
+        return 'W' if (self.winner == 1) == (team == self.home) else 'L'
+
+class _MatchStore:
+    '''Compact store of the matches seen in upstream responses, indexed by team pair, by team and by tournament
+    season; each index is a list of (startTimestamp, id) kept sorted. Coverage records which ranges are known
+    to be complete: a team's or a season's past matches from walking team_last_matches or league_last_matches
+    pages in order, a team's next match from team_next_matches and a pair's whole history from
+    head_to_head_matches. Head-to-head, form and near-match tools are answered from the store when the
+    coverage they need is fresh, and from upstream otherwise.'''
+
+    def __init__(self):
+        self.matches = {}
+        self.by_pair = defaultdict(list)
+        self.by_team = defaultdict(list)
+        self.by_season = defaultdict(list)
+        self.custom_ids = {}
+        self.past = {}
+        self.pages = defaultdict(dict)
+        self.future = {}
+        self.pair_as_of = {}
+        self.answered = Counter()
+
+    def __len__(self):
+        return len(self.matches)
+
+    def _indexes(self, record: _MatchRecord):
+        yield self.by_pair[(min(record.home, record.away), max(record.home, record.away))]
+        yield self.by_team[record.home]
+        yield self.by_team[record.away]
+        if record.tournament is not None and record.season is not None:
+            yield self.by_season[(record.tournament, record.season)]
+
+    def add(self, event: dict):
+        home, away = (event.get('homeTeam') or {}).get('id'), (event.get('awayTeam') or {}).get('id')
+        start = event.get('startTimestamp')
+        if 'id' not in event or home is None or away is None or not start:
+            return
+        record = self.matches.get(event['id'])
+        if record is not None and (record.start, record.home, record.away) != (start, home, away):
+            for index in self._indexes(record):
+                del index[bisect.bisect_left(index, (record.start, record.id))]
+            record = None
+        if record is None:
+            record = self.matches[event['id']] = _MatchRecord()
+            record.id, record.start, record.home, record.away = event['id'], start, home, away
+            record.tournament = ((event.get('tournament') or {}).get('uniqueTournament') or {}).get('id')
+            record.season = (event.get('season') or {}).get('id')
+            for index in self._indexes(record):
+                bisect.insort(index, (start, record.id))
+        record.custom_id = event.get('customId')
+        record.home_name = event['homeTeam'].get('name')
+        record.away_name = event['awayTeam'].get('name')
+        record.home_score = (event.get('homeScore') or {}).get('current')
+        record.away_score = (event.get('awayScore') or {}).get('current')
+        record.status = (event.get('status') or {}).get('type')
+        record.winner = event.get('winnerCode')
+        if record.winner is None and record.status == 'finished' and None not in (record.home_score, record.away_score):
+            record.winner = 1 if record.home_score > record.away_score else 2 if record.away_score > record.home_score else 3
+        if record.custom_id:
+            self.custom_ids[record.custom_id] = (min(home, away), max(home, away))
+
+    def ingest(self, endpoint, args: dict, data, as_of: float, started: float = None):
+        '''Add the matches of a successful response and record the coverage it proves. Only a page that
+        carries an events list proves anything about a range. as_of is when the response was received and
+        started when its request was sent.'''
+        if not isinstance(data, dict):
+            return
+        if endpoint.name in ('team_last_matches', 'league_last_matches') and not isinstance(data.get('events'), list):
+            return
+        events = [e for e in data.get('events') or [] if isinstance(e, dict)]
+        events += [data[k] for k in ('event', 'previousEvent', 'nextEvent') if isinstance(data.get(k), dict)]
+        for event in events:
+            self.add(event)
+        if endpoint.name == 'team_last_matches':
+            self._cover(('team', int(args['id'])), int(args['page']), events, data.get('hasNextPage'), as_of,
+                        as_of if started is None else started)
+        elif endpoint.name == 'league_last_matches':
+            self._cover(('season', int(args['tournamentId']), int(args['seasonId'])), int(args['page']), events,
+                        data.get('hasNextPage'), as_of, as_of if started is None else started)
+        elif endpoint.name == 'team_next_matches' and int(args['page']) == 0:
+            self.future[int(args['id'])] = as_of
+        elif endpoint.name == 'head_to_head_matches':
+            pairs = {(min(r.home, r.away), max(r.home, r.away)) for r in map(self.matches.get, (e.get('id') for e in events)) if r}
+            pair = self.custom_ids.get(args['customId']) or (pairs.pop() if len(pairs) == 1 else None)
+            if pair is not None:
+                self.custom_ids[args['customId']] = pair
+                self.pair_as_of[pair] = as_of
+
+    def _cover(self, scope: tuple, page: int, events: list, has_next, as_of: float, started: float):
+        '''Extend the contiguous range [since, as_of] of known past matches with one page. Later pages may
+        arrive before page 0, as when match_history fetches pages concurrently; they are kept and count once
+        every page before them is known. A page received before page 0 was requested may predate a shift of
+        the list, so it never counts and a gap is never mistaken for coverage.'''
+        starts = [e['startTimestamp'] for e in events if e.get('startTimestamp')]
+        since = 0 if not starts or has_next is False else min(starts)
+        pages = self.pages[scope]
+        coverage = self.past.get(scope)
+        if page == 0:
+            if coverage is not None and since <= coverage['as_of']:
+                since = min(since, coverage['since'])
+            coverage = self.past[scope] = {'since': since, 'as_of': as_of, 'started': started, 'next_page': 1}
+            for old in [p for p, (_, received) in pages.items() if received < started]:
+                del pages[old]
+        else:
+            pages[page] = (since, as_of)
+            if coverage is None:
+                return
+            if as_of < coverage['started']:
+                del pages[page]
+                return
+        while coverage['next_page'] in pages:
+            coverage['since'] = min(coverage['since'], pages.pop(coverage['next_page'])[0])
+            coverage['next_page'] += 1
+
+    def _covers(self, scope: tuple, since: float, until: float) -> bool:
+        coverage = self.past.get(scope)
+        return coverage is not None and coverage['since'] <= since and (
+            coverage['as_of'] >= until or time.time() - coverage['as_of'] <= _cache_ttl['recent'])
+
+    def _finished(self, index: list, before: float = float('inf'), team: int = None) -> list:
+        '''Finished matches of an index that started before a time, most recent first.'''
+        end = bisect.bisect_left(index, (before,))
+        records = (self.matches[match_id] for _, match_id in reversed(index[:end]))
+        return [r for r in records if r.status == 'finished' and (team is None or team in (r.home, r.away))]
+
+    def _pair_complete(self, pair: tuple) -> bool:
+        as_of = self.pair_as_of.get(pair)
+        if as_of is not None and time.time() - as_of <= _cache_ttl['recent']:
+            return True
+        return any(self._covers(('team', team), 0 if as_of is None else as_of, time.time()) for team in pair)
+
+    def head_to_head(self, custom_id: str):
+        pair = self.custom_ids.get(custom_id)
+        if pair is None or not self._pair_complete(pair):
+            return None
+        return {'events': [r.event() for r in reversed(self._finished(self.by_pair.get(pair, [])))]}
+
+    def duel(self, match_id: int):
+        record = self.matches.get(match_id)
+        if record is None:
+            return None
+        pair = (min(record.home, record.away), max(record.home, record.away))
+        if not self._pair_complete(pair):
+            return None
+        results = Counter(r.result(record.home) for r in self._finished(self.by_pair.get(pair, [])) if r.id != match_id)
+        return {'teamDuel': {'homeWins': results['W'], 'awayWins': results['L'], 'draws': results['D']}}
+
+    def form(self, match_id: int, length: int = 5):
+        record = self.matches.get(match_id)
+        if record is None:
+            return None
+        result = {}
+        season = (record.tournament, record.season)
+        for side, team in (('homeTeam', record.home), ('awayTeam', record.away)):
+            for scope, index in ((('season', *season), self.by_season.get(season, [])), (('team', team), self.by_team.get(team, []))):
+                last = self._finished(index, record.start, team)[:length]
+                if self._covers(scope, last[-1].start if len(last) == length else 0, record.start):
+                    result[side] = {'form': [r.result(team) for r in last]}
+                    break
+            else:
+                return None
+        return result
+
+    def near(self, team: int):
+        now = time.time()
+        index = self.by_team.get(team, [])
+        previous = self._finished(index, now, team)[:1]
+        if not self._covers(('team', team), previous[0].start if previous else 0, now):
+            return None
+        as_of = self.future.get(team)
+        if as_of is None or now - as_of > _cache_ttl['recent']:
+            return None
+        upcoming = (self.matches[match_id] for _, match_id in index[bisect.bisect_left(index, (now,)):])
+        following = next((r for r in upcoming if r.status in ('notstarted', 'inprogress')), None)
+        result = {}
+        if previous:
+            result['previousEvent'] = previous[0].event()
+        if following is not None:
+            result['nextEvent'] = following.event()
+        return result
+
+    def stats(self) -> dict:
+        return {
+            'matches': len(self.matches),
+            'finished': sum(1 for r in self.matches.values() if r.status == 'finished'),
+            'pairs': len(self.by_pair),
+            'teams_covered': sum(1 for scope in self.past if scope[0] == 'team'),
+            'seasons_covered': sum(1 for scope in self.past if scope[0] == 'season'),
+            'answered': dict(self.answered),
+        }
+
+_history = _MatchStore()
+
+_projection_token = re.compile(r'\.|\[(\*|\d+)\]')
+
+@functools.lru_cache(maxsize=256)
+def _compile_projection(fields: tuple) -> dict:
+    '''Compile field paths into a tree of keys; a True leaf keeps the whole subtree. Lists are traversed
+    implicitly, so "events.id" and "$.events[*].id" are equivalent; "*" matches every key of an object
+    and a number selects one list element.'''
+    tree = {}
+    for path in fields:
+        path = path.strip()
+        if path.startswith('$'):
+            path = path[1:]
+        parts = [p for p in _projection_token.split(path) if p]
+        if not parts:
+            return True
+        node = tree
+        for part in parts[:-1]:
+            child = node.setdefault(part, {})
+            if child is True:
+                break
+            node = child
+        else:
+            node[parts[-1]] = True
+    return tree
+
+def _merge_projections(a, b):
+    if a is True or b is True:
+        return True
+    merged = dict(a)
+    for k, v in b.items():
+        merged[k] = _merge_projections(merged[k], v) if k in merged else v
+    return merged
+
+def _project(data, tree):
+    if tree is True:
+        return data
+    if isinstance(data, list):
+        plain = {k: v for k, v in tree.items() if k != '*' and not k.isdigit()}
+        if len(plain) == len(tree):
+            return [_project(item, tree) for item in data]
+        result = []
+        for i, item in enumerate(data):
+            subs = [t for t in (plain, tree.get('*'), tree.get(str(i))) if t]
+            if subs:
+                result.append(_project(item, functools.reduce(_merge_projections, subs)))
+        return result
+    if not isinstance(data, dict):
+        return data
+    if '*' not in tree:
+        return {k: _project(data[k], sub) for k, sub in tree.items() if k in data}
+    return {k: _project(v, _merge_projections(tree['*'], tree[k]) if k in tree else tree['*'])
+            for k, v in data.items()}
+
+def _compact(data):
+    '''Drop null values and empty objects/lists.'''
+    if isinstance(data, dict):
+        result = {}
+        for k, v in data.items():
+            v = _compact(v)
+            if v is not None and v != {} and v != []:
+                result[k] = v
+        return result
+    if isinstance(data, list):
+        return [v for v in map(_compact, data) if v is not None and v != {} and v != []]
+    return data
+
+def _annotate(data, hit: bool, age: float = 0, source: str = None):
+    '''Report on the tool result whether it was served from the response cache.'''
+    if not isinstance(data, dict):
+        return data
+    marker = {'hit': hit, 'age': round(age, 3)}
+    if source is not None:
+        marker['source'] = source
+    return {**data, '_cache': marker}
+
+# Scheduling priorities for upstream calls: interactive lookups (live data) go ahead of normal tool
+# calls, which go ahead of bulk sweeps such as pagination walks and schedule backfills.
+PRIORITY_INTERACTIVE, PRIORITY_NORMAL, PRIORITY_BULK = 0, 1, 2
+_priority = contextvars.ContextVar('baseballapi_priority', default=None)
+
+_rate_limit = float(os.getenv('BASEBALLAPI_RATE_LIMIT', '5'))
+_rate_burst = float(os.getenv('BASEBALLAPI_RATE_BURST', str(max(_rate_limit, 1))))
+_quota_reserve = int(os.getenv('BASEBALLAPI_QUOTA_RESERVE', '0'))
+_max_retries = int(os.getenv('BASEBALLAPI_MAX_RETRIES', '3'))
+_backoff_base = float(os.getenv('BASEBALLAPI_BACKOFF_BASE', '0.5'))
+_backoff_max = float(os.getenv('BASEBALLAPI_BACKOFF_MAX', '30'))
+
+_key_bench_seconds = float(os.getenv('BASEBALLAPI_KEY_BENCH_SECONDS', '300'))
+
+class _KeyState:
+    __slots__ = ('key', 'label', 'tokens', 'updated', 'latency', 'in_flight', 'quota_limit', 'quota_remaining',
+                 'quota_reset_at', 'benched_until', 'requests', 'ok', 'throttled', 'forbidden', 'errors')
+
+    def __init__(self, key: str, label: str, burst: float):
+        self.key = key
+        self.label = label
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.latency = 0.1
+        self.in_flight = 0
+        self.quota_limit = None
+        self.quota_remaining = None
+        self.quota_reset_at = None
+        self.benched_until = 0
+        self.requests = 0
+        self.ok = 0
+        self.throttled = 0
+        self.forbidden = 0
+        self.errors = 0
+
+    def usable(self, now: float) -> bool:
+        if self.benched_until > now:
+            return False
+        if self.quota_reset_at is not None and time.time() >= self.quota_reset_at:
+            self.quota_remaining = None
+        return self.quota_remaining is None or self.quota_remaining > 0
+
+    def weight(self, rate: float, burst: float, now: float) -> float:
+        '''Share of new calls for this key: more remaining quota, lower recent latency, fewer calls in flight and
+        an unspent per-key token all make it more likely to be picked.'''
+        share = 1.0
+        if self.quota_remaining is not None and self.quota_limit:
+            share = max(self.quota_remaining / self.quota_limit, 0.01)
+        if rate > 0:
+            self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+            self.updated = now
+            share *= max(self.tokens, 0.05)
+        return share / (self.latency * (1 + self.in_flight))
+
+class _KeyPool:
+    '''The RapidAPI keys calls are spread over. Every key keeps the quota reported by its own rate-limit headers,
+    a moving average of its latency and a token bucket at the per-key rate; a key answered with 429 sits out
+    its Retry-After and one answered with 403 sits out _key_bench_seconds. Picking never waits: when no key
+    is usable the one that comes back first is used.'''
+
+    def __init__(self, keys: list, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.keys = [_KeyState(key, f'key{i + 1}', burst) for i, key in enumerate(keys)]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def pick(self, exclude=()) -> _KeyState:
+        now = time.monotonic()
+        candidates = [k for k in self.keys if k not in exclude] or self.keys
+        usable = [k for k in candidates if k.usable(now)]
+        if not usable:
+            state = min(candidates, key=lambda k: (k.benched_until, k.quota_reset_at or 0))
+        elif len(usable) == 1:
+            state = usable[0]
+        else:
+            state = random.choices(usable, [k.weight(self.rate, self.burst, now) for k in usable])[0]
+        if self.rate > 0:
+            state.weight(self.rate, self.burst, now)
+            state.tokens -= 1
+        state.in_flight += 1
+        state.requests += 1
+        return state
+
+    def available(self, exclude=()) -> bool:
+        now = time.monotonic()
+        return any(k.usable(now) for k in self.keys if k not in exclude)
+
+    def release(self, state: _KeyState, response: httpx.Response = None, elapsed: float = None):
+        state.in_flight -= 1
+        if response is None:
+            state.errors += 1
+            _metrics.inc('baseballapi_key_requests', key=state.label, status='error')
+            return
+        _metrics.inc('baseballapi_key_requests', key=state.label, status=response.status_code)
+        state.latency += 0.2 * (elapsed - state.latency)
+        headers = response.headers
+        if 'x-ratelimit-requests-remaining' in headers:
+            state.quota_remaining = int(headers['x-ratelimit-requests-remaining'])
+        if 'x-ratelimit-requests-limit' in headers:
+            state.quota_limit = int(headers['x-ratelimit-requests-limit'])
+        if 'x-ratelimit-requests-reset' in headers:
+            state.quota_reset_at = time.time() + int(headers['x-ratelimit-requests-reset'])
+        if response.status_code == 429:
+            state.throttled += 1
+            state.benched_until = max(state.benched_until, time.monotonic() + _retry_after(response, 1))
+        elif response.status_code == 403:
+            state.forbidden += 1
+            state.benched_until = max(state.benched_until, time.monotonic() + _key_bench_seconds)
+        elif response.status_code < 500:
+            state.ok += 1
+        else:
+            state.errors += 1
+
+    def usable(self) -> int:
+        now = time.monotonic()
+        return sum(k.usable(now) for k in self.keys)
+
+    def quota(self) -> tuple:
+        '''Plan quota summed over the keys that are not sitting out; unknown while one of them has not reported it.'''
+        now = time.monotonic()
+        keys = [k for k in self.keys if k.benched_until <= now] or self.keys
+        limits = [k.quota_limit for k in keys]
+        remaining = [k.quota_remaining for k in keys]
+        resets = [k.quota_reset_at for k in keys if k.quota_reset_at is not None]
+        return (None if None in limits else sum(limits), None if None in remaining else sum(remaining),
+                min(resets) if resets else None)
+
+    def benched_for(self) -> float:
+        '''Seconds until some key is usable again; 0 while any key is.'''
+        now = time.monotonic()
+        if any(k.usable(now) for k in self.keys):
+            return 0
+        return max(0, min(k.benched_until for k in self.keys) - now)
+
+    def stats(self) -> list:
+        now = time.monotonic()
+        return [{
+            'key': k.label,
+            'hint': '...' + k.key[-4:] if len(k.key) > 8 else None,
+            'usable': k.usable(now),
+            'benched_for': round(max(0, k.benched_until - now), 3),
+            'in_flight': k.in_flight,
+            'latency_ms': round(k.latency * 1000, 1),
+            'requests': k.requests,
+            'ok': k.ok,
+            'throttled': k.throttled,
+            'forbidden': k.forbidden,
+            'errors': k.errors,
+            'quota_limit': k.quota_limit,
+            'quota_remaining': k.quota_remaining,
+            'quota_reset_in': None if k.quota_reset_at is None else round(max(0, k.quota_reset_at - time.time())),
+        } for k in self.keys]
+
+_keys = _KeyPool(_load_keys(), _rate_limit, _rate_burst)
+
+class _Unavailable(RuntimeError):
+    '''Upstream is not called at all right now: the quota is exhausted or a circuit breaker is open.'''
+
+class _Scheduler:
+    '''Token bucket in front of every upstream call that hands out tokens in priority order. It also tracks the
+    plan quota reported in the RapidAPI rate-limit headers of all pooled keys and pauses everything once a 429
+    leaves no usable key.'''
+
+    def __init__(self, rate: float, burst: float, quota_reserve: int, keys: _KeyPool, shared: _DiskStore = None):
+        self.key_rate = rate
+        self.key_burst = burst
+        self.keys = keys
+        self.rate = rate * len(keys)
+        self.shared = shared
+        self.burst = burst * len(keys)
+        self.quota_reserve = quota_reserve
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.quota_limit = None
+        self.quota_remaining = None
+        self.quota_reset_at = None
+        self.granted = 0
+        self.throttled = 0
+        self.retries = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._pump_task = None
+
+    def _sync(self, row):
+        '''Pick up the bucket, pause and quota state written by the other processes sharing the store.'''
+        if row is None:
+            return
+        self.tokens = row[0]
+        self.paused_until = max(self.paused_until, time.monotonic() + row[2] - time.time())
+        self.quota_limit = row[3] if row[3] is not None else self.quota_limit
+        self.quota_remaining = row[4] if row[4] is not None else self.quota_remaining
+        self.quota_reset_at = row[5] if row[5] is not None else self.quota_reset_at
+
+    def _check_quota(self, priority: int):
+        if self.quota_remaining is None:
+            return
+        if self.quota_reset_at is not None and time.time() >= self.quota_reset_at:
+            self.quota_remaining = None
+            return
+        floor = self.quota_reserve if priority == PRIORITY_BULK else 0
+        if self.quota_remaining <= floor:
+            raise _Unavailable(f'RapidAPI quota exhausted ({self.quota_remaining} requests left); '
+                               f'resets in {max(0, round((self.quota_reset_at or time.time()) - time.time()))}s')
+
+    def _delay(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        delay = max(0, self.paused_until - now)
+        if self.tokens < 1:
+            delay = max(delay, (1 - self.tokens) / self.rate)
+        return delay
+
+    async def _take(self) -> float:
+        '''Take a token if one is available now; otherwise return how long to wait for it.'''
+        if self.shared is not None:
+            return await self.shared.run(self.shared.take_token, self.rate, self.burst)
+        if self.rate <= 0:
+            return max(0, self.paused_until - time.monotonic())
+        delay = self._delay()
+        if delay == 0:
+            self.tokens -= 1
+        return delay
+
+    async def acquire(self, priority: int):
+        if self.shared is not None:
+            self._sync(await self.shared.run(self.shared.get_limits))
+        self._check_quota(priority)
+        if self.rate <= 0 and self.shared is None and self.paused_until <= time.monotonic():
+            self.granted += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), waiter))
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.ensure_future(self._pump())
+        await waiter
+
+    async def _pump(self):
+        while self._waiters:
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)
+                continue
+            delay = await self._take()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            waiter = heapq.heappop(self._waiters)[2]
+            self.granted += 1
+            waiter.set_result(None)
+
+    def observe(self, response: httpx.Response):
+        '''Update the quota summed over the key pool and pause all calls when every key is throttled.'''
+        limit, remaining, reset_at = self.keys.quota()
+        self.quota_limit = limit if limit is not None else self.quota_limit
+        self.quota_remaining = remaining if remaining is not None else self.quota_remaining
+        self.quota_reset_at = reset_at if reset_at is not None else self.quota_reset_at
+        # Every key that is not sitting out adds its own rate to the bucket.
+        usable = max(self.keys.usable(), 1)
+        self.rate, self.burst = self.key_rate * usable, self.key_burst * usable
+        pause = 0
+        if response.status_code == 429:
+            self.throttled += 1
+            pause = self.keys.benched_for()
+            self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        if self.shared is not None:
+            self.shared.defer(self.shared.put_limits, self.quota_limit, self.quota_remaining, self.quota_reset_at,
+                              time.time() + pause if pause else 0)
+
+    def stats(self) -> dict:
+        if self.shared is not None:
+            self._sync(self.shared.get_limits())
+        return {
+            'rate': self.rate,
+            'shared': self.shared is not None,
+            'burst': self.burst,
+            'tokens': round(self.tokens, 3),
+            'waiting': len(self._waiters),
+            'granted': self.granted,
+            'throttled': self.throttled,
+            'retries': self.retries,
+            'paused_for': round(max(0, self.paused_until - time.monotonic()), 3),
+            'quota_limit': self.quota_limit,
+            'quota_remaining': self.quota_remaining,
+            'quota_reset_in': None if self.quota_reset_at is None else round(max(0, self.quota_reset_at - time.time())),
+        }
+
+_scheduler = _Scheduler(_rate_limit, _rate_burst, _quota_reserve, _keys, _store if _share_state else None)
+
+def _retry_after(response: httpx.Response, default: float = None):
+    value = response.headers.get('retry-after')
+    try:
+        return float(value) if value is not None else default
+    except ValueError:
+        return default
+
+def _backoff(attempt: int, response: httpx.Response = None) -> float:
+    '''Exponential backoff with full jitter, never shorter than an upstream Retry-After.'''
+    delay = random.uniform(0, min(_backoff_max, _backoff_base * 2 ** attempt))
+    retry_after = _retry_after(response) if response is not None else None
+    return max(delay, retry_after or 0)
+
+_breaker_window = int(os.getenv('BASEBALLAPI_BREAKER_WINDOW', '20'))
+_breaker_min_calls = min(5, _breaker_window)
+_breaker_failure_ratio = float(os.getenv('BASEBALLAPI_BREAKER_FAILURE_RATIO', '0.5'))
+_breaker_slow_seconds = float(os.getenv('BASEBALLAPI_BREAKER_SLOW_SECONDS', '5'))
+_breaker_cooldown = float(os.getenv('BASEBALLAPI_BREAKER_COOLDOWN', '30'))
+
+class _CircuitBreaker:
+    '''Circuit breaker for one upstream endpoint group. It opens when too many of the recent calls failed or were
+    slower than _breaker_slow_seconds, fails calls fast while open, and after a cooldown lets a single probe
+    through whose outcome closes or reopens it.'''
+
+    def __init__(self, group: str):
+        self.group = group
+        self.state = 'closed'
+        self.outcomes = deque(maxlen=_breaker_window)
+        self.opened_at = 0
+        self.probing = False
+        self.trips = 0
+        self.rejected = 0
+
+    def available(self) -> bool:
+        if self.state == 'open':
+            return time.monotonic() - self.opened_at >= _breaker_cooldown
+        return self.state == 'closed' or not self.probing
+
+    def enter(self) -> bool:
+        '''Admit a call or raise while the breaker is open. Returns whether the call is the half-open probe.'''
+        if not self.available():
+            self.rejected += 1
+            raise _Unavailable(f'Upstream {self.group} endpoints are failing; '
+                               f'retrying in {max(0, _breaker_cooldown - (time.monotonic() - self.opened_at)):.0f}s')
+        if self.state == 'closed':
+            return False
+        self._transition('half_open')
+        self.probing = True
+        return True
+
+    def record(self, ok, probe: bool):
+        '''Record a call outcome: True, False (failed or slow) or None (did not reach upstream).'''
+        if probe:
+            self.probing = False
+            if ok is not None:
+                self.outcomes.clear()
+                self._transition('closed' if ok else 'open')
+            return
+        if ok is None or self.state != 'closed':
+            return
+        self.outcomes.append(ok)
+        if len(self.outcomes) >= _breaker_min_calls and self.outcomes.count(False) >= _breaker_failure_ratio * len(self.outcomes):
+            self.outcomes.clear()
+            self._transition('open')
+
+    def _transition(self, state: str):
+        if state == 'open':
+            self.opened_at = time.monotonic()
+            self.trips += 1
+        if state != self.state:
+            self.state = state
+            _metrics.inc('baseballapi_breaker_transitions', group=self.group, state=state)
+
+    def stats(self) -> dict:
+        return {
+            'state': self.state,
+            'recent_calls': len(self.outcomes),
+            'recent_failures': self.outcomes.count(False),
+            'trips': self.trips,
+            'rejected': self.rejected,
+            'retry_in': round(max(0, _breaker_cooldown - (time.monotonic() - self.opened_at)), 3) if self.state == 'open' else 0,
+        }
+
+_breakers = {}
+
+def _breaker(group: str) -> _CircuitBreaker:
+    if group not in _breakers:
+        _breakers[group] = _CircuitBreaker(group)
+    return _breakers[group]
+
+async def _request(endpoint, url: str, payload: dict, priority: int, headers: dict = None) -> httpx.Response:
+    '''Send one upstream GET through the endpoint group's circuit breaker and the scheduler with a key from the
+    pool, retrying transport errors, 429s and 5xx responses. A 429 or 403 moves the call to another usable key
+    without backing off. The final outcome, including slowness, is reported to the breaker.'''
+    global _upstream_in_flight
+    trace = _trace.get()
+    name = endpoint.name
+    breaker = _breaker(endpoint.group)
+    probe = breaker.enter()
+    ok = None
+    refused = []
+    try:
+        for attempt in range(_max_retries + 1):
+            started = time.perf_counter()
+            await _scheduler.acquire(priority)
+            queued = time.perf_counter() - started
+            key = _keys.pick(refused)
+            try:
+                async with _inflight:
+                    _upstream_in_flight += 1
+                    started = time.perf_counter()
+                    try:
+                        response = await _client.get(_upstream_url + url, params=payload,
+                                                     headers={**(headers or {}), 'x-rapidapi-key': key.key})
+                    finally:
+                        _upstream_in_flight -= 1
+            except httpx.TransportError as e:
+                _keys.release(key)
+                _metrics.inc('baseballapi_upstream_requests', endpoint=name, status=type(e).__name__)
+                if attempt == _max_retries:
+                    ok = False
+                    raise
+                _scheduler.retries += 1
+                _metrics.inc('baseballapi_upstream_retries', endpoint=name)
+                await asyncio.sleep(_backoff(attempt))
+                continue
+            elapsed = time.perf_counter() - started
+            _keys.release(key, response, elapsed)
+            _metrics.observe('baseballapi_upstream_duration_seconds', elapsed, endpoint=name)
+            _metrics.observe('baseballapi_upstream_response_bytes', len(response.content), endpoint=name)
+            _metrics.inc('baseballapi_upstream_requests', endpoint=name, status=response.status_code)
+            if trace is not None:
+                trace['queue'] += queued
+                trace['upstream'] += elapsed
+                trace['upstream_calls'] += 1
+            _scheduler.observe(response)
+            if _record_dir:
+                _record(url, payload, response)
+            switch = response.status_code in (403, 429)
+            if switch:
+                refused.append(key)
+                switch = _keys.available(refused)
+            failed = response.status_code == 429 or response.status_code >= 500
+            if not (failed or switch) or attempt == _max_retries:
+                ok = not failed and elapsed <= _breaker_slow_seconds
+                return response
+            _scheduler.retries += 1
+            _metrics.inc('baseballapi_upstream_retries', endpoint=name)
+            if not switch:
+                await asyncio.sleep(_backoff(attempt, response))
+    finally:
+        breaker.record(ok, probe)
+
+def _record(url: str, payload: dict, response: httpx.Response):
+    '''Save an upstream response as a fixture that replay.py can serve.'''
+    params = {k: str(v) for k, v in _cache_key(url, payload)[1]}
+    name = hashlib.sha1(json.dumps([url, params], sort_keys=True).encode()).hexdigest()
+    fixture = {
+        'path': url,
+        'params': params,
+        'status': response.status_code,
+        'headers': {k: v for k, v in response.headers.items() if k in ('content-type', 'etag', 'last-modified')},
+        'body': base64.b64encode(response.content).decode(),
     }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def league_home_team_events(tournamentId: Annotated[Union[int, float], Field(description='The unique tournament ID for which you want to retrieve the home team events. Default: 19442 Minimum: -9223372036854776000 Maximum: 9223372036854776000')],
-                            seasonId: Annotated[Union[int, float], Field(description='The ID of the season for which you want to retrieve the home team events. Default: 49349 Minimum: -9223372036854776000 Maximum: 9223372036854776000')]) -> dict: 
-    '''This endpoint retrieves the last 5 matches for a specific league in a given season for home events.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/19442/season/49349/team-events/home'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
-        'tournamentId': tournamentId,
-        'seasonId': seasonId,
+    os.makedirs(_record_dir, exist_ok=True)
+    with open(os.path.join(_record_dir, name + '.json'), 'w') as f:
+        json.dump(fixture, f)
+
+class _priority_scope:
+    '''Run the upstream calls made inside the block (and tasks spawned from it) at the given priority.'''
+
+    def __init__(self, priority: int):
+        self.priority = priority
+
+    def __enter__(self):
+        self._token = _priority.set(self.priority)
+
+    def __exit__(self, *exc):
+        _priority.reset(self._token)
+
+# Upstream requests currently in flight, keyed like the cache, so identical concurrent calls share one
+# request and its parsed result. This works independently of whether the response cache is enabled.
+_pending = {}
+_coalesced = 0
+
+async def _fetch(key: tuple, endpoint, url: str, payload: dict, match_id, immutable: bool, ttl: float):
+    priority = _priority.get()
+    if priority is None:
+        priority = PRIORITY_INTERACTIVE if endpoint.cache == 'live' else PRIORITY_NORMAL
+    response = await _request(endpoint, url, payload, priority)
+    if response.status_code != 200:
+        # Error bodies are never returned as data, so nothing downstream mistakes them for an empty answer.
+        raise RuntimeError(f'Upstream {endpoint.name} failed with HTTP {response.status_code}{_error_detail(response)}')
+    started = time.perf_counter()
+    data = _loads(response.content)
+    trace = _trace.get()
+    if trace is not None:
+        trace['parse'] += time.perf_counter() - started
+    _mark_finished(data)
+    _entities.ingest(data)
+    if not immutable and endpoint.name in _final_endpoints and _is_finished(match_id):
+        immutable, ttl = True, float('inf')
+    _cache.put(key, data, len(response.content), ttl)
+    if _store is not None and (immutable or endpoint.cache in _persistent_classes):
+        await _store.run(_store.put, json.dumps(key), response.content, None if immutable else ttl)
+    return data
+
+def _error_detail(response: httpx.Response) -> str:
+    try:
+        body = _loads(response.content)
+    except ValueError:
+        return ''
+    message = body.get('error') or body.get('message') if isinstance(body, dict) else None
+    return f': {message}' if isinstance(message, str) else ''
+
+def _forget_pending(key: tuple, task: asyncio.Task):
+    if _pending.get(key) is task:
+        del _pending[key]
+    if not task.cancelled():
+        task.exception()
+
+def _start(key: tuple, factory) -> asyncio.Task:
+    task = asyncio.ensure_future(factory())
+    _pending[key] = task
+    task.add_done_callback(lambda t: _forget_pending(key, t))
+    return task
+
+async def _shared(key: tuple, factory):
+    '''Run factory() once for all concurrent callers with the same key. Returns (result, joined).'''
+    global _coalesced
+    task = _pending.get(key)
+    if task is not None:
+        _coalesced += 1
+        return await asyncio.shield(task), True
+    return await asyncio.shield(_start(key, factory)), False
+
+def _revalidate(key: tuple, factory):
+    '''Refresh an entry in the background unless a fetch for it is already running.'''
+    if key not in _pending:
+        _start(key, factory)
+
+async def _cached(key: tuple) -> bool:
+    return _cache.fresh(key) or (_store is not None and await _store.run(_store.get, json.dumps(key)) is not None)
+
+async def _get(endpoint, args: dict, fields: List[str] = None, compact: bool = False) -> dict:
+    url, payload = endpoint.url(args), endpoint.query(args)
+    # A cached upstream answer is complete; a local one is rebuilt from indexed fields, so it only stands in
+    # for a miss.
+    if endpoint.local is not None and not await _cached(_cache_key(url, payload)):
+        local = endpoint.local(args)
+        if local is not None:
+            _metrics.inc('baseballapi_cache_requests', endpoint=endpoint.name, result='local')
+            return _shape(local, True, 0, 'local', fields, compact)
+    match_id = int(args['id']) if endpoint.match_scoped else None
+    started = time.time()
+    data, hit, age, source = await _lookup(endpoint, url, payload, match_id)
+    _metrics.inc('baseballapi_cache_requests', endpoint=endpoint.name, result=source or 'miss')
+    # Only 200 bodies get this far: _fetch raises on anything else and the caches hold nothing else.
+    if source != 'memory':
+        as_of = time.time() - age
+        _history.ingest(endpoint, args, data, as_of, as_of if hit else started)
+    if not _speculative.get() and _priority.get() != PRIORITY_BULK:
+        if hit and _prefetcher.issued:
+            _prefetcher.hit(_cache_key(url, payload))
+        if _prefetcher.budget > 0:
+            _prefetcher.after(endpoint, args)
+    return _shape(data, hit, age, source, fields, compact)
+
+def _shape(data, hit: bool, age: float, source: str, fields: List[str] = None, compact: bool = False):
+    if fields:
+        data = _project(data, _compile_projection(tuple(fields)))
+    if compact:
+        data = _compact(data)
+    return _annotate(data, hit, age, source)
+
+async def _lookup(endpoint, url: str, payload: dict, match_id):
+    '''Resolve a request from memory, disk or upstream, serving an expired copy while it is refreshed or while
+    upstream is failing. Returns (data, hit, age, source).'''
+    key = _cache_key(url, payload)
+    now = time.monotonic()
+    entry = _cache.get(key, _stale_if_error)
+    if entry is not None and entry[0] >= now:
+        return entry[2], True, now - entry[3], 'memory'
+    stale = (entry[2], now - entry[3], now - entry[0]) if entry is not None else None
+    immutable = endpoint.name in _final_endpoints and _is_finished(match_id)
+    ttl = float('inf') if immutable else _cache_ttl[endpoint.cache]
+    # With a shared store another worker may have refreshed the row since this copy expired, so an expired
+    # memory copy only wins over the row when it is at least as recent.
+    if _store is not None and key not in _pending and (stale is None or _share_state):
+        row = await _store.run(_store.get, json.dumps(key), _stale_if_error)
+        if row is not None and (stale is None or time.time() - row[1] < stale[1]):
+            data = _loads(row[0])
+            _entities.ingest(data)
+            age = time.time() - row[1]
+            if row[2] is None or row[2] >= time.time():
+                _cache.put(key, data, len(row[0]), ttl if row[2] is None else row[2] - time.time(), age)
+                return data, True, age, 'disk'
+            stale = (data, age, time.time() - row[2])
+    fetch = lambda: _fetch(key, endpoint, url, payload, match_id, immutable, ttl)
+    if stale is not None:
+        data, age, overdue = stale
+        breaker = _breaker(endpoint.group)
+        # Live data is only worth serving stale while upstream is failing: the pollers built on it would
+        # otherwise always see the snapshot before the latest one.
+        revalidate = endpoint.cache != 'live' and overdue <= ttl * _stale_while_revalidate
+        if not breaker.available() or revalidate:
+            if breaker.available():
+                _revalidate(key, fetch)
+            return data, True, age, 'stale'
+        try:
+            fresh, joined = await asyncio.wait_for(_shared(key, fetch), _stale_deadline)
+        except Exception:
+            return data, True, age, 'stale'
+        return fresh, False, 0, 'coalesced' if joined else None
+    data, joined = await _shared(key, fetch)
+    return data, False, 0, 'coalesced' if joined else None
+
+class _ImageStore:
+    '''Content-addressed image store. Each distinct image body is kept once, under its SHA-256 digest, in a
+    byte-bounded in-memory LRU and optionally as a file in BASEBALLAPI_IMAGE_DIR. A per-URL index maps
+    requests to digests plus the ETag/Last-Modified validators used to revalidate with conditional requests.'''
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._blobs = OrderedDict()
+        self._index = {}
+        self._thumbnails = {}
+        self.hits = 0
+        self.fetched = 0
+        self.revalidated = 0
+        self.deduplicated = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def lookup(self, key: str):
+        entry = self._index.get(key)
+        if entry is None and _store is not None:
+            entry = _store.get_image(key)
+            if entry is not None:
+                self._index[key] = entry
+        return entry
+
+    def remember(self, key: str, entry: dict):
+        self._index[key] = entry
+        if _store is not None:
+            _store.defer(_store.put_image, key, entry)
+
+    def blob(self, digest: str):
+        data = self._blobs.get(digest)
+        if data is not None:
+            self._blobs.move_to_end(digest)
+            return data
+        if self.directory:
+            path = os.path.join(self.directory, digest)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    data = f.read()
+                self._keep(digest, data)
+        return data
+
+    def add(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        if self.blob(digest) is not None:
+            self.deduplicated += 1
+            return digest
+        self._keep(digest, data)
+        if self.directory:
+            path = os.path.join(self.directory, digest)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+        return digest
+
+    def _keep(self, digest: str, data: bytes):
+        if digest in self._blobs or len(data) > self.max_bytes:
+            return
+        self._blobs[digest] = data
+        self.bytes += len(data)
+        while self.bytes > self.max_bytes:
+            self.bytes -= len(self._blobs.popitem(last=False)[1])
+
+    def thumbnail(self, digest: str, size: int, image_format: str) -> bytes:
+        '''Downscale an image so that its longest edge is at most size pixels; needs Pillow.'''
+        thumb = self._thumbnails.get((digest, size))
+        if thumb is not None and self.blob(thumb) is not None:
+            return self.blob(thumb)
+        try:
+            from PIL import Image as PILImage
+        except ImportError:
+            raise RuntimeError('Downscaling images requires Pillow (pip install pillow)')
+        with PILImage.open(io.BytesIO(self.blob(digest))) as img:
+            img.thumbnail((size, size))
+            out = io.BytesIO()
+            img.save(out, format=image_format.upper().replace('JPG', 'JPEG'))
+        thumb = self.add(out.getvalue())
+        self._thumbnails[(digest, size)] = thumb
+        return self.blob(thumb)
+
+    def stats(self) -> dict:
+        return {
+            'indexed': len(self._index),
+            'blobs': len(self._blobs),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'fetched': self.fetched,
+            'revalidated': self.revalidated,
+            'deduplicated': self.deduplicated,
+        }
+
+_images = _ImageStore(os.getenv('BASEBALLAPI_IMAGE_DIR'), int(os.getenv('BASEBALLAPI_IMAGE_MAX_BYTES', str(32 * 1024 * 1024))))
+
+async def _fetch_image(key: str, endpoint, url: str, entry: dict) -> dict:
+    headers = {}
+    if entry is not None and _images.blob(entry['digest']) is not None:
+        if entry.get('etag'):
+            headers['if-none-match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['if-modified-since'] = entry['last_modified']
+    priority = _priority.get()
+    response = await _request(endpoint, url, {}, PRIORITY_NORMAL if priority is None else priority, headers)
+    if response.status_code == 304 and headers:
+        _images.revalidated += 1
+        entry = {**entry, 'checked_at': time.time()}
+    elif response.status_code == 200:
+        _images.fetched += 1
+        content_type = response.headers.get('content-type', 'image/png').split(';')[0]
+        entry = {
+            'digest': _images.add(response.content),
+            'format': content_type.split('/')[-1] if content_type.startswith('image/') else 'png',
+            'etag': response.headers.get('etag'),
+            'last_modified': response.headers.get('last-modified'),
+            'checked_at': time.time(),
+        }
+    else:
+        raise RuntimeError(f'Upstream returned HTTP {response.status_code} for {url}')
+    _images.remember(key, entry)
+    return entry
+
+async def _get_image(endpoint, args: dict, size: int = None) -> Image:
+    '''Serve an upstream image as raw bytes from the content-addressed store, revalidating once it is stale.'''
+    url = endpoint.url(args)
+    key = json.dumps(_cache_key(url, {}))
+    entry = _images.lookup(key)
+    fresh = entry is not None and time.time() - entry['checked_at'] < _cache_ttl['static']
+    if fresh and _images.blob(entry['digest']) is not None:
+        _images.hits += 1
+    else:
+        stored = entry if entry is not None and _images.blob(entry['digest']) is not None else None
+        try:
+            entry, _ = await _shared(('image', key), lambda: _fetch_image(key, endpoint, url, entry))
+        except Exception:
+            if stored is None:
+                raise
+            entry = stored
+    if size:
+        return Image(data=_images.thumbnail(entry['digest'], size, entry['format']), format=entry['format'])
+    return Image(data=_images.blob(entry['digest']), format=entry['format'])
+
+mcp = FastMCP('baseballapi')
+
+def _tool():
+    '''Register a tool and record when its handler finishes, so serialization can be timed separately.'''
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def handler(*args, **kwargs):
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                trace = _trace.get()
+                if trace is not None:
+                    trace['handler_done'] = time.perf_counter()
+        return mcp.tool()(handler)
+    return decorator
+
+class _MetricsMiddleware(Middleware):
+    '''Time every tool call by phase, count outcomes and result sizes, and optionally append a trace line.'''
+
+    async def on_call_tool(self, context, call_next):
+        tool = context.message.name
+        trace = {'queue': 0.0, 'upstream': 0.0, 'parse': 0.0, 'upstream_calls': 0, 'handler_done': None}
+        token = _trace.set(trace)
+        started = time.perf_counter()
+        outcome = 'ok'
+        size = 0
+        try:
+            result = await call_next(context)
+            size = sum(len(getattr(c, 'text', None) or getattr(c, 'data', None) or '') for c in result.content)
+            return result
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            _trace.reset(token)
+            finished = time.perf_counter()
+            handler_done = trace['handler_done'] or finished
+            phases = {
+                'total': finished - started,
+                'handler': handler_done - started,
+                'serialize': finished - handler_done,
+                'queue': trace['queue'],
+                'upstream': trace['upstream'],
+                'parse': trace['parse'],
+            }
+            for phase, seconds in phases.items():
+                _metrics.observe('baseballapi_tool_duration_seconds', seconds, tool=tool, phase=phase)
+            _metrics.observe('baseballapi_tool_response_bytes', size, tool=tool)
+            _metrics.inc('baseballapi_tool_calls', tool=tool, outcome=outcome)
+            if _trace_enabled:
+                _write_trace({'ts': time.time(), 'tool': tool, 'outcome': outcome, 'bytes': size,
+                              'upstream_calls': trace['upstream_calls'],
+                              **{f'{phase}_ms': round(seconds * 1000, 3) for phase, seconds in phases.items()}})
+
+def _write_trace(line: dict):
+    with open(_trace_log or 'baseballapi-trace.jsonl', 'a') as f:
+        f.write(json.dumps(line) + '\n')
+
+mcp.add_middleware(_MetricsMiddleware())
+
+_Number = Union[int, float]
+_fields_description = 'Optional projection: field paths to keep, dotted or JSONPath-like, e.g. "events.id", "standings.*.rows.*.team.name" or "$.events[*].homeScore.current".'
+_compact_description = 'Drop null and empty values from the result.'
+_size_description = 'Optional maximum width/height in pixels; the image is downscaled server-side to fit.'
+
+class _Endpoint:
+    '''One upstream route: its URL template, cache class and the typed parameters of the tool generated for it.
+
+    The template is split into literal and placeholder parts once, so building a URL per call is a join.
+    Parameters named in the template fill the path; any others are sent as query parameters.
+    '''
+
+    def __init__(self, name: str, path: str, cache: str, doc: str, *params, response: str = 'json', local=None):
+        self.name = name
+        self.path = path
+        self.cache = cache
+        self.doc = doc
+        self.params = params
+        self.response = response
+        self.local = local
+        self.parts = [(literal, field) for literal, field, _, _ in string.Formatter().parse(path)]
+        self.path_params = {field for _, field in self.parts if field}
+        self.match_scoped = path.startswith('/api/baseball/match/{id}')
+        self.group = path.split('/')[3]
+
+    def url(self, args: dict) -> str:
+        return ''.join(literal + (_path_value(args[field]) if field else '') for literal, field in self.parts)
+
+    def query(self, args: dict) -> dict:
+        return {k: v for k, v in args.items() if k not in self.path_params and v is not None}
+
+def _path_value(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return urllib.parse.quote(str(value), safe='')
+
+def _search_local(args: dict):
+    '''Answer search from the entity index when its best hit is confident enough: the query is at least
+    _search_min_length characters and every query word is a whole word of the hit's name. A prefix or fuzzy
+    hit alone says nothing about what else upstream would return, so those go upstream.'''
+    query = _normalize_name(args['term'])
+    if len(query) < _search_min_length:
+        return None
+    results = _entities.search(query)
+    if not results or results[0]['score'] < _search_min_score:
+        return None
+    if not set(query.split()) <= set(_normalize_name(str(results[0]['entity'].get('name') or '')).split()):
+        return None
+    return {'results': results}
+
+_local_history = os.getenv('BASEBALLAPI_LOCAL_HISTORY', '1').lower() in ('1', 'true', 'yes')
+
+def _history_local(query: str, param: str):
+    '''Answer an endpoint from the local match store, keyed by one of its arguments.'''
+    def local(args: dict):
+        if not _local_history:
+            return None
+        value = args[param]
+        data = getattr(_history, query)(value if isinstance(value, str) else int(value))
+        if data is not None:
+            _history.answered[query] += 1
+        return data
+    return local
+
+_endpoints = {e.name: e for e in (
+    _Endpoint('search', '/api/baseball/search/{term}', 'reference',
+              'Search for baseball-related entities using the provided search term, and filter the results to show only baseball-related entities.',
+              ('term', str, 'The search term to use for finding baseball-related entities.'),
+              local=_search_local),
+    _Endpoint('match_player_statistics', '/api/baseball/match/{id}/player/{playerId}/statistics', 'live',
+              'Get the statistics for a specific baseball player in the match by providing its ID.',
+              ('id', _Number, 'The ID of the baseball match for which you want to get the player statistics. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('playerId', _Number, 'The player id. Default: 977489')),
+    _Endpoint('match_lineups', '/api/baseball/match/{id}/lineups', 'recent',
+              'Get the lineups for a specific baseball match by providing its ID.',
+              ('id', _Number, 'The ID of the baseball match for which you want to get the lineups. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('match_statistics', '/api/baseball/match/{id}/statistics', 'live',
+              'Get the statistics for a specific baseball match by providing its ID.',
+              ('id', _Number, 'The ID of the baseball match for which you want to get the statistics. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('match_highlights', '/api/baseball/match/{id}/highlights', 'recent',
+              'Get the highlights of a specific baseball match using the match ID.',
+              ('id', _Number, 'The ID of the match for which you want to get highlights. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('match_schedules', '/api/baseball/matches/{day}/{month}/{year}', 'recent',
+              'This operation returns the baseball match schedules for the given date, including match timings, teams, and other relevant information.',
+              ('day', _Number, 'The day of the month for which you want to retrieve the match schedules (1-31). Default: 1 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('month', _Number, 'The month for which you want to retrieve the match schedules (1-12). Default: 8 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('year', _Number, 'The year for which you want to retrieve the match schedules (e.g., 2022). Default: 2022 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('match_details', '/api/baseball/match/{id}', 'recent',
+              'Get detailed information for a specific baseball match by providing the match ID.',
+              ('id', _Number, 'The ID of the match for which you want to get the details. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('live_matches', '/api/baseball/matches/live', 'live',
+              'Get live baseball matches that are currently taking place.'),
+    _Endpoint('match_odds', '/api/baseball/match/{id}/odds', 'live',
+              'Get the odds for a specific baseball match using the match ID.',
+              ('id', _Number, 'The ID of the match for which you want to get the odds. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('match_h2_hduel', '/api/baseball/match/{id}/duel', 'recent',
+              'Get the head-to-head duel for a specific baseball match using the match ID.',
+              ('id', _Number, 'The ID of the match for which you want to get the head-to-head duel. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              local=_history_local('duel', 'id')),
+    _Endpoint('match_votes', '/api/baseball/match/{id}/votes', 'live',
+              'Get the votes for a specific baseball match using the match ID.',
+              ('id', _Number, 'The ID of the match for which you want to get the votes. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('head_to_head_matches', '/api/baseball/match/{customId}/h2h', 'recent',
+              'Get head-to-head match data for a specific baseball match using its custom ID.',
+              ('customId', str, 'The custom ID of the match for which you want to get the head-to-head matches.'),
+              local=_history_local('head_to_head', 'customId')),
+    _Endpoint('pre_match_form', '/api/baseball/match/{id}/form', 'recent',
+              'Get the pre-match form for a specific baseball match using the match ID.',
+              ('id', _Number, 'The ID of the match for which you want to get the pre-match form. Default: 9864379 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              local=_history_local('form', 'id')),
+    _Endpoint('player_near_matches', '/api/baseball/player/{id}/matches/near', 'recent',
+              'Get the near matches for a specific baseball player using the player ID.',
+              ('id', _Number, 'The player ID for which you want to retrieve the near matches. Default: 977489 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('player_regular_season_statistics', '/api/baseball/player/{id}/tournament/{tournamentId}/season/{seasonId}/statistics/regularSeason', 'reference',
+              'Get the regular season statistics for a specific baseball player using the player ID, tournament ID, and season ID.',
+              ('id', _Number, 'The player ID for which you want to retrieve the statistics. Default: 977489 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('tournamentId', _Number, "The unique tournament ID for which you want to retrieve the player's statistics. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000"),
+              ('seasonId', _Number, "The season ID for which you want to retrieve the player's statistics. Default: 29168 Minimum: -9223372036854776000 Maximum: 9223372036854776000")),
+    _Endpoint('player_statistics_seasons', '/api/baseball/player/{id}/statistics/seasons', 'reference',
+              'Get the statistics seasons for a specific baseball player using the player ID.',
+              ('id', _Number, 'The player ID for which you want to retrieve the statistics seasons. Default: 977489 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('player_last_matches', '/api/baseball/player/{id}/matches/previous/{page}', 'recent',
+              'Get the last matches played by a specific Baseball player by providing the player ID and page number.',
+              ('id', _Number, 'The ID of the player for which you want to retrieve the last matches. Default: 1195558 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('page', _Number, 'Zero-based page number. Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('player_image', '/api/baseball/player/{id}/image', 'static',
+              'Get the image for a specific baseball player using the player ID. Generates a PNG image.',
+              ('id', _Number, 'The player ID for which you want to retrieve the image. Default: 977489 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              response='image'),
+    _Endpoint('player_details', '/api/baseball/player/{id}', 'reference',
+              'Get the details for a specific baseball player using the player ID.',
+              ('id', _Number, 'The player ID for which you want to retrieve the details. Default: 977489 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('team_standings_seasons', '/api/baseball/team/{id}/standings/seasons', 'reference',
+              'Get the team standings for different seasons for a given team by providing its ID.',
+              ('id', _Number, 'The ID of the team for which you want to retrieve the team standings for different seasons. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('team_tournaments', '/api/baseball/team/{id}/tournaments', 'reference',
+              'Get the tournaments in which a specific baseball team participates.',
+              ('id', _Number, 'The ID of the team for which you want to retrieve the tournaments. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('team_logo_image', '/api/baseball/team/{id}/image', 'static',
+              'Get the logo image for a specific baseball team using the team ID. Generates a PNG image.',
+              ('id', _Number, 'The team ID for which you want to retrieve the logo image. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              response='image'),
+    _Endpoint('team_next_matches', '/api/baseball/team/{id}/matches/next/{page}', 'recent',
+              'Get upcoming baseball matches for a specific team.',
+              ('id', _Number, 'The ID of the team for which you want to retrieve upcoming matches. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('page', _Number, 'The page number (zero-based) of the results you want to retrieve. Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('team_details', '/api/baseball/team/{id}', 'reference',
+              'Get the details for a specific baseball team using the team ID.',
+              ('id', _Number, 'The team ID for which you want to retrieve the details. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('team_near_matches', '/api/baseball/team/{id}/matches/near', 'recent',
+              'Get the near matches for a specific baseball team using the team ID.',
+              ('id', _Number, 'The team ID for which you want to retrieve the near matches. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              local=_history_local('near', 'id')),
+    _Endpoint('team_last_matches', '/api/baseball/team/{id}/matches/previous/{page}', 'recent',
+              'Get the last matches for a specific baseball team by providing its ID and page number.',
+              ('id', _Number, 'The ID of the baseball team for which you want to retrieve the last matches. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('page', _Number, 'The zero-based page number of the results you want to retrieve. Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('team_media', '/api/baseball/team/{id}/media', 'reference',
+              'Get the media for a specific baseball team using the team ID.',
+              ('id', _Number, 'The team ID for which you want to retrieve the media. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('team_players', '/api/baseball/team/{id}/players', 'reference',
+              'Get the players for a specific baseball team using the team ID.',
+              ('id', _Number, 'The team ID for which you want to retrieve the players. Default: 3633 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('league_away_standings', '/api/baseball/tournament/{tournamentId}/season/{seasonId}/standings/away', 'recent',
+              'Get the away standings of a specific baseball league for a specific season.',
+              ('tournamentId', _Number, 'The unique tournament ID for which you want to retrieve the away standings. Default: 19442 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('seasonId', _Number, 'The ID of the season for which you want to retrieve the away standings. Default: 49349 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('league_details', '/api/baseball/tournament/{tournamentId}', 'reference',
+              'Get the details of a specific baseball league using the unique tournament ID.',
+              ('tournamentId', _Number, "The unique tournament ID for which you want to retrieve the league's details. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000")),
+    _Endpoint('league_home_standings', '/api/baseball/tournament/{tournamentId}/season/{seasonId}/standings/home', 'recent',
+              'Get the home standings of a specific baseball league for a specific season.',
+              ('tournamentId', _Number, 'The unique tournament ID for which you want to retrieve the home standings. Default: 19442 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('seasonId', _Number, 'The ID of the season for which you want to retrieve the home standings. Default: 49349 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('league_total_standings', '/api/baseball/tournament/{tournamentId}/season/{seasonId}/standings/total', 'recent',
+              'Get the total standings of a specific baseball league for a specific season.',
+              ('tournamentId', _Number, 'The unique tournament ID for which you want to retrieve the total standings. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('seasonId', _Number, 'The ID of the season for which you want to retrieve the total standings. Default: 29168 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('league_next_matches', '/api/baseball/tournament/{tournamentId}/season/{seasonId}/matches/next/{page}', 'recent',
+              'Get the next matches for a specific baseball league using the tournament ID, season ID, and page.',
+              ('tournamentId', _Number, "The unique tournament ID for which you want to retrieve the league's next matches. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000"),
+              ('seasonId', _Number, "The season ID for which you want to retrieve the league's next matches. Default: 39143 Minimum: -9223372036854776000 Maximum: 9223372036854776000"),
+              ('page', _Number, 'Zero-based page. Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('league_media', '/api/baseball/tournament/{tournamentId}/media', 'reference',
+              'Get the media for a specific baseball league using the unique tournament ID.',
+              ('tournamentId', _Number, 'The unique tournament ID for which you want to retrieve the league media. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('league_total_team_events', '/api/baseball/tournament/{tournamentId}/season/{seasonId}/team-events/total', 'recent',
+              'This endpoint retrieves the last 5 matches for a specific league in a given season for both home and away events.',
+              ('tournamentId', _Number, 'The unique tournament ID for which you want to retrieve the total team events. Default: 19442 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('seasonId', _Number, 'The ID of the season for which you want to retrieve the total team events. Default: 49349 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('league_cup_trees', '/api/baseball/tournament/{tournamentId}/season/{seasonId}/cuptrees', 'reference',
+              'Get the cup trees for a specific baseball league using the tournament ID and season ID.',
+              ('tournamentId', _Number, 'The unique tournament ID for which you want to retrieve the league cup trees. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('seasonId', _Number, 'The season ID for which you want to retrieve the league cup trees. Default: 29168 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('category_tournaments', '/api/baseball/tournament/all/category/{id}', 'static',
+              'Get a list of all leagues from a specific baseball category using the category ID.',
+              ('id', _Number, 'The category ID for which you want to retrieve all leagues. Default: 1374 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('league_away_team_events', '/api/baseball/tournament/{tournamentId}/season/{seasonId}/team-events/away', 'recent',
+              'This endpoint retrieves the last 5 matches for a specific league in a given season for away events.',
+              ('tournamentId', _Number, 'The unique tournament ID for which you want to retrieve the away team events. Default: 19442 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('seasonId', _Number, 'The ID of the season for which you want to retrieve the away team events. Default: 49349 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('league_seasons', '/api/baseball/tournament/{tournamentId}/seasons', 'reference',
+              'Get the seasons for a specific baseball league using the unique tournament ID.',
+              ('tournamentId', _Number, "The unique tournament ID for which you want to retrieve the league's seasons. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000")),
+    _Endpoint('category_schedules', '/api/baseball/category/{id}/events/{day}/{month}/{year}', 'recent',
+              'Get the baseball match schedules for a specific day and category using the category ID, day, month, and year.',
+              ('id', _Number, 'The category ID for which you want to retrieve the schedules. Default: 1374 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('day', _Number, 'The day for which you want to retrieve the schedules. Default: 1 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('month', _Number, 'The month for which you want to retrieve the schedules. Default: 8 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('year', _Number, 'The year for which you want to retrieve the schedules. Default: 2022 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('league_logo_image', '/api/baseball/tournament/{tournamentId}/image', 'static',
+              'Get the logo image for a specific baseball league using the unique tournament ID. Generates a PNG image.',
+              ('tournamentId', _Number, 'The unique tournament ID for which you want to retrieve the league logo image. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              response='image'),
+    _Endpoint('league_last_matches', '/api/baseball/tournament/{tournamentId}/season/{seasonId}/matches/last/{page}', 'recent',
+              'Get the last matches for a league by providing the unique tournament ID, season ID, and the page number (0-based).',
+              ('tournamentId', _Number, 'The unique tournament ID for which you want to retrieve the last matches. Default: 11205 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('seasonId', _Number, 'The season ID for which you want to retrieve the last matches. Default: 39143 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('page', _Number, 'The 0-based page number for which you want to retrieve the last matches. Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('league_home_team_events', '/api/baseball/tournament/{tournamentId}/season/{seasonId}/team-events/home', 'recent',
+              'This endpoint retrieves the last 5 matches for a specific league in a given season for home events.',
+              ('tournamentId', _Number, 'The unique tournament ID for which you want to retrieve the home team events. Default: 19442 Minimum: -9223372036854776000 Maximum: 9223372036854776000'),
+              ('seasonId', _Number, 'The ID of the season for which you want to retrieve the home team events. Default: 49349 Minimum: -9223372036854776000 Maximum: 9223372036854776000')),
+    _Endpoint('categories', '/api/baseball/tournament/categories', 'static',
+              'Get a list of all baseball categories.'),
+)}
+
+def _register(endpoint: _Endpoint):
+    '''Generate and register the MCP tool for an endpoint, with a signature built from its parameter table.'''
+    parameters = [inspect.Parameter(name, inspect.Parameter.POSITIONAL_OR_KEYWORD,
+                                    annotation=Annotated[kind, Field(description=description)])
+                  for name, kind, description in endpoint.params]
+    if endpoint.response == 'image':
+        extras = [('size', int, _size_description, None)]
+        returns = Image
+
+        async def handler(size: int = None, **args):
+            return await _get_image(endpoint, args, size)
+    else:
+        extras = [('fields', List[str], _fields_description, None), ('compact', bool, _compact_description, False)]
+        returns = dict
+
+        async def handler(fields: List[str] = None, compact: bool = False, **args):
+            return await _get(endpoint, args, fields, compact)
+    parameters += [inspect.Parameter(name, inspect.Parameter.POSITIONAL_OR_KEYWORD, default=default,
+                                     annotation=Annotated[kind, Field(description=description)])
+                   for name, kind, description, default in extras]
+    handler.__name__ = handler.__qualname__ = endpoint.name
+    handler.__doc__ = endpoint.doc
+    handler.__signature__ = inspect.Signature(parameters, return_annotation=returns)
+    handler.__annotations__ = {p.name: p.annotation for p in parameters}
+    handler.__annotations__['return'] = returns
+    return _tool()(handler)
+
+_tools = {name: _register(endpoint) for name, endpoint in _endpoints.items()}
+
+async def _call(name: str, **args) -> dict:
+    '''Call an endpoint tool from inside the server, going through the same caches as MCP clients. Fan-out
+    calls (bundles, pagination walks, pollers) are not client behaviour, so the prefetcher ignores them.'''
+    token = _speculative.set(True)
+    try:
+        return await _tools[name].fn(**args)
+    finally:
+        _speculative.reset(token)
+
+_prefetch_budget = float(os.getenv('BASEBALLAPI_PREFETCH_BUDGET', '0'))
+_prefetch_rules = os.getenv('BASEBALLAPI_PREFETCH_RULES',
+                            'match_details=match_lineups,match_statistics,match_odds')
+_prefetch_learn = os.getenv('BASEBALLAPI_PREFETCH_LEARN', '1').lower() in ('1', 'true', 'yes')
+_prefetch_confidence = float(os.getenv('BASEBALLAPI_PREFETCH_CONFIDENCE', '0.6'))
+_prefetch_window = 60
+_prefetch_min_samples = 5
+# Set while a speculative or internal request runs, so it is neither learned from nor used to trigger prefetches.
+_speculative = contextvars.ContextVar('baseballapi_speculative', default=False)
+
+class _Prefetcher:
+    '''Warms the cache with the calls that usually follow a tool call. Follow-ups come from configured rules
+    (trigger=follow_up,...;...) and, optionally, are learned: an endpoint whose arguments are a subset of a call
+    made shortly before it (e.g. match_lineups(id) after match_details(id)) is counted as following it, and is
+    prefetched once it has followed in at least _prefetch_confidence of the trigger's calls. Prefetches run
+    at bulk priority, only while nothing else waits for the scheduler, and within an hourly request budget.'''
+
+    def __init__(self, rules: str, budget: float, learn: bool):
+        self.rules = defaultdict(list)
+        for rule in filter(None, (r.strip() for r in rules.split(';'))):
+            trigger, _, follow_ups = rule.partition('=')
+            self.rules[trigger.strip()] = [f.strip() for f in follow_ups.split(',') if f.strip()]
+        self.budget = budget
+        self.learn = learn
+        self.tokens = budget
+        self.updated = time.monotonic()
+        self.recent = deque(maxlen=256)
+        self.triggers = Counter()
+        self.pairs = defaultdict(Counter)
+        self.issued = OrderedDict()
+        self.started = 0
+        self.used = 0
+        self.failed = 0
+        self.skipped_budget = 0
+        self.skipped_busy = 0
+        self._tasks = set()
+
+    def follow_ups(self, name: str) -> list:
+        follow_ups = list(self.rules.get(name, ()))
+        seen = self.triggers[name]
+        if seen >= _prefetch_min_samples:
+            follow_ups += [f for f, n in self.pairs[name].items() if n >= _prefetch_confidence * seen and f not in follow_ups]
+        return follow_ups
+
+    def after(self, endpoint, args: dict):
+        '''Learn from a client call and start prefetching its follow-ups.'''
+        args = {k: v for k, v in args.items() if v is not None}
+        now = time.monotonic()
+        while self.recent and now - self.recent[0][0] > _prefetch_window:
+            self.recent.popleft()
+        if self.learn and args:
+            for _, name, trigger_args, followed in self.recent:
+                if name != endpoint.name and endpoint.name not in followed and args.items() <= trigger_args.items():
+                    followed.add(endpoint.name)
+                    self.pairs[name][endpoint.name] += 1
+        self.triggers[endpoint.name] += 1
+        self.recent.append((now, endpoint.name, args, set()))
+        for name in self.follow_ups(endpoint.name):
+            follow_up = _endpoints.get(name)
+            if follow_up is not None and all(p in args for p, _, _ in follow_up.params):
+                self.prefetch(follow_up, {p: args[p] for p, _, _ in follow_up.params})
+
+    def prefetch(self, endpoint, args: dict) -> bool:
+        '''Fetch a response in the background unless it is cached, in flight, over budget or upstream is busy.'''
+        key = _cache_key(endpoint.url(args), endpoint.query(args))
+        if _cache.fresh(key) or key in _pending:
+            return False
+        if _scheduler._waiters or not _breaker(endpoint.group).available():
+            self.skipped_busy += 1
+            return False
+        now = time.monotonic()
+        self.tokens = min(self.budget, self.tokens + (now - self.updated) * self.budget / 3600)
+        self.updated = now
+        if self.tokens < 1:
+            self.skipped_budget += 1
+            return False
+        self.tokens -= 1
+        self.started += 1
+        self.issued[key] = True
+        while len(self.issued) > 4096:
+            self.issued.popitem(last=False)
+        task = asyncio.ensure_future(self._run(endpoint, args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, endpoint, args: dict):
+        _speculative.set(True)
+        try:
+            with _priority_scope(PRIORITY_BULK):
+                await _get(endpoint, args)
+        except Exception:
+            self.failed += 1
+
+    def hit(self, key: tuple):
+        if self.issued.pop(key, None):
+            self.used += 1
+
+    def stats(self) -> dict:
+        return {
+            'budget_per_hour': self.budget,
+            'budget_left': round(self.tokens, 3),
+            'rules': {name: self.follow_ups(name) for name in set(self.rules) | set(self.pairs)},
+            'started': self.started,
+            'used': self.used,
+            'failed': self.failed,
+            'skipped_budget': self.skipped_budget,
+            'skipped_busy': self.skipped_busy,
+        }
+
+_prefetcher = _Prefetcher(_prefetch_rules, _prefetch_budget, _prefetch_learn)
+
+_warmup = os.getenv('BASEBALLAPI_WARMUP', '').lower() in ('1', 'true', 'yes')
+_warmup_lead = float(os.getenv('BASEBALLAPI_WARMUP_LEAD_SECONDS', '1800'))
+_warmup_sections = ('match_details', 'match_lineups')
+
+class _SlateWarmer:
+    '''Daily warm-up of the current slate. It loads today's schedule (UTC) once an hour and, from
+    _warmup_lead seconds before each match starts until first pitch, keeps its details and lineups cached
+    through the prefetcher, so the first client request for a match is a cache hit.'''
+
+    def __init__(self, lead: float):
+        self.lead = lead
+        self.day = None
+        self.loaded_at = 0
+        self.slate = []
+        self.warmed = 0
+        self.error = None
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        # The task is spawned from a client request; none of its context belongs to the warm-up.
+        _speculative.set(True)
+        _trace.set(None)
+        _priority.set(None)
+        while True:
+            try:
+                await self.tick()
+                self.error = None
+            except Exception as e:
+                self.error = f'{type(e).__name__}: {e}'
+            await asyncio.sleep(60)
+
+    async def tick(self):
+        today = datetime.now(timezone.utc).date()
+        if today != self.day or time.time() - self.loaded_at > 3600:
+            with _priority_scope(PRIORITY_BULK):
+                data = await _call('match_schedules', day=today.day, month=today.month, year=today.year)
+            self.slate = sorted((e['startTimestamp'], e['id']) for e in data.get('events') or []
+                                if e.get('startTimestamp') and (e.get('status') or {}).get('type') == 'notstarted')
+            self.day, self.loaded_at = today, time.time()
+        now = time.time()
+        for start, match_id in self.slate:
+            if start - self.lead <= now < start:
+                for name in _warmup_sections:
+                    self.warmed += _prefetcher.prefetch(_endpoints[name], {'id': match_id})
+
+    def stats(self) -> dict:
+        now = time.time()
+        return {
+            'enabled': _warmup,
+            'day': self.day.isoformat() if self.day else None,
+            'slate': len(self.slate),
+            'upcoming': sum(1 for start, _ in self.slate if start > now),
+            'warming': sum(1 for start, _ in self.slate if start - self.lead <= now < start),
+            'warmed': self.warmed,
+            'error': self.error,
+        }
+
+_warmer = _SlateWarmer(_warmup_lead)
+
+class _WarmupMiddleware(Middleware):
+    '''Start the slate warm-up with the first MCP request, once an event loop is running.'''
+
+    async def on_request(self, context, call_next):
+        _warmer.start()
+        return await call_next(context)
+
+if _warmup:
+    mcp.add_middleware(_WarmupMiddleware())
+
+_history_sources = {
+    'player_last': ('player_last_matches', 'id', -1),
+    'team_last': ('team_last_matches', 'id', -1),
+    'team_next': ('team_next_matches', 'id', 1),
+    'league_last': ('league_last_matches', 'tournamentId', -1),
+    'league_next': ('league_next_matches', 'tournamentId', 1),
+}
+
+def _event_summary(event: dict) -> dict:
+    return {
+        'id': event.get('id'),
+        'startTimestamp': event.get('startTimestamp'),
+        'homeTeam': (event.get('homeTeam') or {}).get('name'),
+        'awayTeam': (event.get('awayTeam') or {}).get('name'),
+        'homeScore': (event.get('homeScore') or {}).get('current'),
+        'awayScore': (event.get('awayScore') or {}).get('current'),
+        'status': (event.get('status') or {}).get('type'),
     }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
-
-@mcp.tool()
-def categories() -> dict: 
-    '''Get a list of all baseball categories.'''
-    url = 'https://baseballapi.p.rapidapi.com/api/baseball/tournament/categories'
-    headers = {'x-rapidapi-host': 'baseballapi.p.rapidapi.com', 'x-rapidapi-key': rapid_api_key}
-    payload = {
+
+@_tool()
+async def match_history(source: Annotated[Literal['player_last', 'team_last', 'team_next', 'league_last', 'league_next'], Field(description='Which paged match list to walk: last matches of a player, last or next matches of a team, or last or next matches of a league season.')],
+                        id: Annotated[int, Field(description='The player, team or unique tournament ID, depending on the source.')],
+                        ctx: Context,
+                        seasonId: Annotated[int, Field(description='The season ID. Required for the league sources.')] = None,
+                        limit: Annotated[int, Field(description='Stop after this many matches. Default: 100')] = 100,
+                        until: Annotated[str, Field(description='Date cutoff (YYYY-MM-DD). For last-match sources, matches before this date are not returned; for next-match sources, matches after it are not returned.')] = None,
+                        max_pages: Annotated[int, Field(description='Maximum number of pages to fetch. Default: 20')] = 20,
+                        prefetch: Annotated[int, Field(description='Number of pages fetched concurrently ahead of the current one. Default: 3')] = 3) -> dict: 
+    '''Walk the pages of a paged match list (player, team or league last/next matches) automatically. Pages are prefetched concurrently and walking stops at the limit, the date cutoff or the last page. Each page is streamed to the client as it arrives, with progress updates. If a page fails, walking stops there and the matches collected so far are returned with hasMore and the error.'''
+    tool, id_param, direction = _history_sources[source]
+    if source.startswith('league') and seasonId is None:
+        raise ValueError('seasonId is required for league sources')
+    cutoff = datetime.strptime(until, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp() if until else None
+    if cutoff is not None and direction > 0:
+        # Next-match walks keep the whole until day: the cutoff is the following midnight, exclusive.
+        cutoff += 86400
+    args = {id_param: id}
+    if seasonId is not None:
+        args['seasonId'] = seasonId
+    events, page, done, has_more, error = [], 0, False, True, None
+    while not done and page < max_pages:
+        window = range(page, min(page + max(prefetch, 1), max_pages))
+        with _priority_scope(PRIORITY_BULK):
+            results = await asyncio.gather(*(_call(tool, page=p, **args) for p in window), return_exceptions=True)
+        for p, result in zip(window, results):
+            if isinstance(result, Exception):
+                # Keep the pages already streamed; the caller can resume from this page.
+                error = f'page {p}: {type(result).__name__}: {result}'
+                done = True
+                break
+            page_events = result.get('events') or []
+            in_range = [e for e in page_events if cutoff is None or
+                        ((e.get('startTimestamp') or 0) < cutoff if direction > 0 else (e.get('startTimestamp') or 0) >= cutoff)]
+            kept = in_range[:limit - len(events)]
+            events.extend(kept)
+            page = p + 1
+            await ctx.report_progress(len(events), limit)
+            await ctx.info(json.dumps({'page': p, 'events': [_event_summary(e) for e in kept]}))
+            has_more = bool(page_events) and result.get('hasNextPage', True) and len(in_range) == len(page_events)
+            if not has_more or len(events) >= limit:
+                done = True
+                break
+    result = {'source': source, 'pages': page, 'hasMore': has_more, 'events': events}
+    if error is not None:
+        result['error'] = error
+    return result
+
+_bundle_concurrency = int(os.getenv('BASEBALLAPI_BUNDLE_CONCURRENCY', '8'))
+
+# Per-match sections that only need the match ID; match_player_statistics also needs a player and is left out.
+_match_sections = {
+    'details': 'match_details',
+    'lineups': 'match_lineups',
+    'statistics': 'match_statistics',
+    'odds': 'match_odds',
+    'votes': 'match_votes',
+    'highlights': 'match_highlights',
+    'h2h_duel': 'match_h2_hduel',
+    'pre_match_form': 'pre_match_form',
+}
+
+@_tool()
+async def match_bundle(ids: Annotated[List[int], Field(description='The IDs of the matches to fetch, e.g. every match of a day\'s slate.')],
+                       sections: Annotated[List[Literal['details', 'lineups', 'statistics', 'odds', 'votes', 'highlights', 'h2h_duel', 'pre_match_form']], Field(description='The sections to fetch for every match. Default: all sections.')] = None) -> dict: 
+    '''Get several sections (details, lineups, statistics, odds, ...) for several baseball matches in one call. Sections are fetched concurrently and a failing section (an upstream error status such as 404, or a failed request) is reported under errors instead of failing the whole bundle.'''
+    sections = list(dict.fromkeys(sections or _match_sections))
+    limit = asyncio.Semaphore(_bundle_concurrency)
+    matches = {match_id: {'id': match_id, 'errors': {}} for match_id in dict.fromkeys(ids)}
+
+    async def fetch(match_id: int, section: str):
+        async with limit:
+            try:
+                matches[match_id][section] = await _call(_match_sections[section], id=match_id)
+            except Exception as e:
+                matches[match_id]['errors'][section] = f'{type(e).__name__}: {e}'
+
+    await asyncio.gather(*(fetch(match_id, section) for match_id in matches for section in sections))
+    return {'matches': list(matches.values())}
+
+_schedule_max_days = int(os.getenv('BASEBALLAPI_SCHEDULE_MAX_DAYS', '93'))
+_final_statuses = ('finished', 'canceled', 'postponed', 'abandoned', 'removed')
+
+# Columns of the per-day schedule table: name, array typecode (None for interned strings) and source path.
+_schedule_columns = (
+    ('id', 'q', ('id',)),
+    ('startTimestamp', 'q', ('startTimestamp',)),
+    ('tournamentId', 'q', ('tournament', 'uniqueTournament', 'id')),
+    ('homeTeamId', 'q', ('homeTeam', 'id')),
+    ('homeTeam', None, ('homeTeam', 'name')),
+    ('awayTeamId', 'q', ('awayTeam', 'id')),
+    ('awayTeam', None, ('awayTeam', 'name')),
+    ('status', None, ('status', 'type')),
+    ('homeScore', 'i', ('homeScore', 'current')),
+    ('awayScore', 'i', ('awayScore', 'current')),
+)
+
+def _dig(data, path: tuple):
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+class _ScheduleDay:
+    '''The matches of one day as a compact columnar table: integer columns in typed arrays (-1 when
+    missing), string columns as lists of interned strings.'''
+
+    def __init__(self, columns: dict, final: bool):
+        self.columns = columns
+        self.final = final
+
+    @classmethod
+    def from_events(cls, events: list, day: date):
+        columns = {}
+        for name, typecode, path in _schedule_columns:
+            values = [_dig(e, path) for e in events]
+            if typecode is None:
+                columns[name] = [sys.intern(v) if isinstance(v, str) else None for v in values]
+            else:
+                columns[name] = array(typecode, (v if isinstance(v, int) else -1 for v in values))
+        final = day < datetime.now(timezone.utc).date() and all(s in _final_statuses for s in columns['status'])
+        return cls(columns, final)
+
+    @classmethod
+    def from_json(cls, data: dict):
+        columns = {name: list(data[name]) if typecode is None else array(typecode, data[name])
+                   for name, typecode, _ in _schedule_columns}
+        return cls(columns, True)
+
+    def to_json(self) -> dict:
+        return {name: list(column) for name, column in self.columns.items()}
+
+    def rows(self, team_id: int = None):
+        ids = self.columns['id']
+        for i in range(len(ids)):
+            if team_id is not None and team_id not in (self.columns['homeTeamId'][i], self.columns['awayTeamId'][i]):
+                continue
+            row = {name: self.columns[name][i] for name, _, _ in _schedule_columns}
+            yield {k: None if v == -1 else v for k, v in row.items()}
+
+_schedule_days = {}
+
+async def _schedule_day(category_id, day: date):
+    '''The schedule table of one day; final past days come from memory or disk and are never re-fetched.'''
+    scope = 'all' if category_id is None else str(category_id)
+    table = _schedule_days.get((scope, day))
+    if table is not None and table.final:
+        return table, False
+    if _store is not None:
+        stored = _store.get_schedule_day(scope, day.isoformat())
+        if stored is not None:
+            table = _schedule_days[(scope, day)] = _ScheduleDay.from_json(stored)
+            return table, False
+    if category_id is None:
+        data = await _call('match_schedules', day=day.day, month=day.month, year=day.year)
+    else:
+        data = await _call('category_schedules', id=category_id, day=day.day, month=day.month, year=day.year)
+    # _fetch raises on upstream errors; a body without an events list is not a schedule either, and must not
+    # become an empty final day that is never fetched again.
+    if not isinstance(data.get('events'), list):
+        raise RuntimeError(f'Upstream returned no schedule for {day.isoformat()}')
+    table = _schedule_days[(scope, day)] = _ScheduleDay.from_events(data['events'], day)
+    if table.final and _store is not None:
+        await _store.run(_store.put_schedule_day, scope, day.isoformat(), table.to_json())
+    return table, not data.get('_cache', {}).get('hit', False)
+
+@_tool()
+async def schedule_range(start: Annotated[str, Field(description='First day of the range (YYYY-MM-DD).')],
+                         end: Annotated[str, Field(description='Last day of the range, inclusive (YYYY-MM-DD).')],
+                         categoryId: Annotated[int, Field(description='Only matches of this category, e.g. 1374. Default: all categories.')] = None,
+                         teamId: Annotated[int, Field(description='Only matches in which this team plays.')] = None,
+                         columnar: Annotated[bool, Field(description='Return the matches as columns (one list per field) instead of one object per match.')] = False) -> dict: 
+    '''Get all baseball matches between two dates, optionally for one category and/or team. Days are fetched concurrently under the rate limit and kept locally as a compact table, so overlapping ranges are answered without upstream calls and fully finished past days are never fetched again.'''
+    first, last = date.fromisoformat(start), date.fromisoformat(end)
+    days = (last - first).days + 1
+    if days < 1:
+        raise ValueError('end must not be before start')
+    if days > _schedule_max_days:
+        raise ValueError(f'range is limited to {_schedule_max_days} days')
+    with _priority_scope(PRIORITY_BULK):
+        results = await asyncio.gather(*(_schedule_day(categoryId, first + timedelta(days=i)) for i in range(days)))
+    rows = [row for table, _ in results for row in table.rows(teamId)]
+    result = {'start': start, 'end': end, 'days': days, 'fetched': sum(fetched for _, fetched in results), 'count': len(rows)}
+    if columnar:
+        result['columns'] = {name: [row[name] for row in rows] for name, _, _ in _schedule_columns}
+    else:
+        result['matches'] = rows
+    return result
+
+class _PlayerStatsTable:
+    '''Regular-season statistics of every player of one tournament season, one NumPy array per stat
+    and one row per player (NaN where a player has no value).'''
+
+    def __init__(self, players: list, stats: list):
+        self.ids = np.array([p['id'] for p in players], dtype=np.int64)
+        self.names = [p.get('name') for p in players]
+        self.team_ids = np.array([p['teamId'] for p in players], dtype=np.int64)
+        self.teams = [p.get('team') for p in players]
+        self.positions = np.array([p.get('position') or '' for p in players], dtype=object)
+        keys = sorted({k for row in stats for k, v in row.items() if isinstance(v, (int, float)) and not isinstance(v, bool) and k != 'id'})
+        self.stats = {k: np.array([row.get(k, np.nan) if isinstance(row.get(k), (int, float)) else np.nan for row in stats], dtype=np.float64)
+                      for k in keys}
+        self.built_at = time.time()
+
+    def column(self, stat: str):
+        if stat not in self.stats:
+            raise ValueError(f'unknown stat {stat!r}; available: {", ".join(self.stats)}')
+        return self.stats[stat]
+
+_player_stats = {}
+
+def _player_stats_key(tournamentId: int, seasonId: int) -> str:
+    return json.dumps(['player_stats', tournamentId, seasonId])
+
+def _player_stats_table(tournamentId: int, seasonId: int):
+    '''The ingested table of a season, (re)loaded from the shared store when another worker ingested it.'''
+    table = _player_stats.get((tournamentId, seasonId))
+    if _share_state:
+        row = _store.get(_player_stats_key(tournamentId, seasonId))
+        if row is not None and (table is None or row[1] > table.built_at):
+            data = _loads(row[0])
+            table = _player_stats[(tournamentId, seasonId)] = _PlayerStatsTable(data['players'], data['stats'])
+            table.built_at = row[1]
+    return table
+_stat_filter = re.compile(r'^\s*(\w+)\s*(>=|<=|==|!=|>|<)\s*(-?[\d.]+)\s*$')
+_stat_ops = {'>=': operator.ge, '<=': operator.le, '==': operator.eq, '!=': operator.ne, '>': operator.gt, '<': operator.lt}
+
+def _require_numpy():
+    '''Import NumPy on first use, so the server starts without paying for it.'''
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError('The player stats store requires NumPy (pip install numpy)')
+        np = numpy
+
+@_tool()
+async def player_stats_ingest(tournamentId: Annotated[int, Field(description='The unique tournament ID, e.g. 11205.')],
+                              seasonId: Annotated[int, Field(description='The season ID, e.g. 29168.')],
+                              ctx: Context) -> dict: 
+    '''Load the regular-season statistics of every player of every team in a tournament season into the local stats store, so that player_stats_leaderboard can answer from it. Teams come from the total standings and players from the team rosters; all requests run concurrently at bulk priority. Players whose statistics could not be fetched are counted in failed; an exhausted quota or an open circuit breaker aborts the ingest.'''
+    _require_numpy()
+    with _priority_scope(PRIORITY_BULK):
+        standings = await _call('league_total_standings', tournamentId=tournamentId, seasonId=seasonId)
+        teams = {row['team']['id']: row['team'].get('name')
+                 for group in standings.get('standings') or [] for row in group.get('rows') or [] if 'team' in row}
+        rosters = await asyncio.gather(*(_call('team_players', id=team_id) for team_id in teams))
+        players = {}
+        for team_id, roster in zip(teams, rosters):
+            for item in roster.get('players') or []:
+                player = item.get('player') or {}
+                if 'id' in player:
+                    players[player['id']] = {'id': player['id'], 'name': player.get('name'), 'position': player.get('position'),
+                                             'teamId': team_id, 'team': teams[team_id]}
+        await ctx.info(f'{len(teams)} teams, {len(players)} players')
+        done = failed = 0
+
+        async def stats_of(player_id: int) -> dict:
+            nonlocal done, failed
+            try:
+                data = await _call('player_regular_season_statistics', id=player_id, tournamentId=tournamentId, seasonId=seasonId)
+            except _Unavailable:
+                # Every remaining player would fail the same way; an ingest missing most of its players is no use.
+                raise
+            except Exception:
+                failed += 1
+                data = {}
+            done += 1
+            await ctx.report_progress(done, len(players))
+            return data.get('statistics') or {}
+
+        stats = await asyncio.gather(*(stats_of(player_id) for player_id in players))
+    ingested = [(p, row) for p, row in zip(players.values(), stats) if row]
+    table = _PlayerStatsTable([p for p, _ in ingested], [row for _, row in ingested])
+    _player_stats[(tournamentId, seasonId)] = table
+    if _share_state:
+        await _store.run(_store.put, _player_stats_key(tournamentId, seasonId),
+                         json.dumps({'players': [p for p, _ in ingested], 'stats': [row for _, row in ingested]}).encode())
+        table.built_at = time.time()
+    return {'tournamentId': tournamentId, 'seasonId': seasonId, 'teams': len(teams), 'players': len(table.ids), 'failed': failed,
+            'stats': list(table.stats)}
+
+@_tool()
+async def player_stats_leaderboard(tournamentId: Annotated[int, Field(description='The unique tournament ID of an ingested season.')],
+                                   seasonId: Annotated[int, Field(description='The season ID of an ingested season.')],
+                                   stat: Annotated[str, Field(description='The stat to rank by, e.g. "ops", "homeRuns" or "era".')],
+                                   top: Annotated[int, Field(description='Number of players to return. Default: 10')] = 10,
+                                   ascending: Annotated[bool, Field(description='Rank lowest first (e.g. for ERA). Default: false')] = False,
+                                   where: Annotated[List[str], Field(description='Filters on stats such as "plateAppearances>=300" or "inningsPitched>50".')] = None,
+                                   teamId: Annotated[int, Field(description='Only players of this team.')] = None,
+                                   position: Annotated[str, Field(description='Only players with this position code, e.g. "P".')] = None,
+                                   columns: Annotated[List[str], Field(description='Additional stats to include for every returned player.')] = None,
+                                   percentiles: Annotated[List[float], Field(description='Percentiles (0-100) of the stat over the filtered players to report.')] = None) -> dict: 
+    '''Rank the players of an ingested tournament season by a stat, with optional filters, computed locally in vectorized form. Run player_stats_ingest for the season first.'''
+    _require_numpy()
+    table = _player_stats_table(tournamentId, seasonId)
+    if table is None:
+        raise ValueError('season not ingested; call player_stats_ingest first')
+    values = table.column(stat)
+    mask = ~np.isnan(values)
+    for expression in where or []:
+        match = _stat_filter.match(expression)
+        if match is None:
+            raise ValueError(f'invalid filter {expression!r}; expected e.g. "atBats>=100"')
+        column = table.column(match.group(1))
+        mask &= ~np.isnan(column) & _stat_ops[match.group(2)](column, float(match.group(3)))
+    if teamId is not None:
+        mask &= table.team_ids == teamId
+    if position is not None:
+        mask &= table.positions == position
+    rows = np.flatnonzero(mask)
+    order = rows[np.argsort(values[rows], kind='stable')]
+    if not ascending:
+        order = order[::-1]
+    order = order[:max(top, 0)]
+    extra = [table.column(c) for c in columns or []]
+    leaders = []
+    for rank, i in enumerate(order, 1):
+        leader = {'rank': rank, 'id': int(table.ids[i]), 'name': table.names[i], 'team': table.teams[i], stat: float(values[i])}
+        leader.update({c: None if np.isnan(col[i]) else float(col[i]) for c, col in zip(columns or [], extra)})
+        leaders.append(leader)
+    result = {'stat': stat, 'players': int(rows.size), 'leaders': leaders}
+    if percentiles and rows.size:
+        result['percentiles'] = {str(p): float(v) for p, v in zip(percentiles, np.percentile(values[rows], percentiles))}
+    return result
+
+_live_poll_interval = float(os.getenv('BASEBALLAPI_LIVE_POLL_SECONDS', '15'))
+_live_idle_timeout = float(os.getenv('BASEBALLAPI_LIVE_IDLE_SECONDS', '300'))
+_live_history = int(os.getenv('BASEBALLAPI_LIVE_HISTORY', '500'))
+
+def _live_state(event: dict) -> dict:
+    '''The per-match fields of the live board that are tracked for changes.'''
+    status = event.get('status') or {}
+    return {
+        'homeTeam': (event.get('homeTeam') or {}).get('name'),
+        'awayTeam': (event.get('awayTeam') or {}).get('name'),
+        'homeScore': (event.get('homeScore') or {}).get('current'),
+        'awayScore': (event.get('awayScore') or {}).get('current'),
+        'status': status.get('type'),
+        'statusDescription': status.get('description'),
+        'lastPeriod': event.get('lastPeriod'),
     }
-    payload = {k: v for k, v in payload.items() if v is not None}
-    response = requests.get(url, headers=headers, params=payload)
-    return response.json()
 
+class _LiveBoard:
+    '''Background poller that keeps the latest live_matches snapshot and a bounded log of per-match changes.
+    It is started by the first live_changes call and stops again once no client has asked for a while.'''
+
+    def __init__(self, interval: float, idle_timeout: float, history: int):
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        # Versions start at a random offset, so a cursor issued by another worker or an earlier process
+        # falls outside this board's range and gets a reset instead of the wrong changes.
+        self.version = random.randrange(1, 1 << 20) * 1_000_000
+        self.matches = {}
+        self.log = deque(maxlen=history)
+        self.updated_at = None
+        self.error = None
+        self.polls = 0
+        self._last_request = 0
+        self._task = None
+        self._ready = asyncio.Event()
+
+    async def ensure_running(self):
+        self._last_request = time.monotonic()
+        if self._task is None or self._task.done():
+            self._ready.clear()
+            self._task = asyncio.ensure_future(self._run())
+        await self._ready.wait()
+
+    async def _run(self):
+        while time.monotonic() - self._last_request < self.idle_timeout:
+            try:
+                self.refresh(await _call('live_matches'))
+                self.error = None
+            except Exception as e:
+                self.error = f'{type(e).__name__}: {e}'
+            self._ready.set()
+            await asyncio.sleep(self.interval)
+
+    def refresh(self, data: dict):
+        self.polls += 1
+        current = {e['id']: _live_state(e) for e in data.get('events') or [] if 'id' in e}
+        changes = []
+        for match_id, state in current.items():
+            previous = self.matches.get(match_id)
+            if previous is None:
+                changes.append({'id': match_id, 'change': 'added', 'state': state})
+            elif previous != state:
+                fields = {k: v for k, v in state.items() if previous.get(k) != v}
+                changes.append({'id': match_id, 'change': 'updated', 'fields': fields})
+        changes.extend({'id': match_id, 'change': 'removed'} for match_id in self.matches.keys() - current.keys())
+        self.matches = current
+        self.updated_at = time.time()
+        if changes:
+            self.version += 1
+            self.log.append((self.version, changes))
+
+    def since(self, cursor: int) -> dict:
+        result = {'version': self.version, 'updatedAt': self.updated_at, 'error': self.error}
+        oldest = self.log[0][0] if self.log else self.version + 1
+        if cursor <= 0 or cursor > self.version or cursor < oldest - 1:
+            result.update(reset=True, matches=[{'id': k, **v} for k, v in self.matches.items()])
+        else:
+            result.update(reset=False, changes=[c for version, changes in self.log if version > cursor for c in changes])
+        return result
+
+_live_board = _LiveBoard(_live_poll_interval, _live_idle_timeout, _live_history)
+
+@_tool()
+async def live_changes(since: Annotated[int, Field(description='The version returned by the previous call. Use 0 (the default) to get the full live board.')] = 0) -> dict: 
+    '''Get the changes (scores, inning, status, matches starting or ending) on the live baseball board since a previous version. The board is refreshed by a shared background poller, so polling this tool does not add upstream traffic. When the version is unknown or too old, the full board is returned with reset=true.'''
+    await _live_board.ensure_running()
+    return _live_board.since(since)
+
+_track_interval = float(os.getenv('BASEBALLAPI_TRACK_INTERVAL', '30'))
+_track_capacity = int(os.getenv('BASEBALLAPI_TRACK_CAPACITY', '720'))
+_track_max_matches = int(os.getenv('BASEBALLAPI_TRACK_MAX_MATCHES', '50'))
+
+def _decimal_odds(value):
+    '''Decimal price of a fractional ("4/5") or decimal ("1.80") odds string.'''
+    try:
+        if isinstance(value, str) and '/' in value:
+            numerator, denominator = value.split('/')
+            return 1 + float(numerator) / float(denominator)
+        return float(value) if value is not None else None
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def _odds_values(data: dict) -> dict:
+    values = {}
+    for market in data.get('markets') or []:
+        name = market.get('marketName') or str(market.get('marketId'))
+        if market.get('choiceGroup'):
+            name = f"{name} {market['choiceGroup']}"
+        for choice in market.get('choices') or []:
+            price = _decimal_odds(choice.get('fractionalValue'))
+            if price is not None:
+                values[f"odds.{name}.{choice.get('name')}"] = price
+    return values
+
+def _statistics_values(data: dict) -> dict:
+    values = {}
+    for period in data.get('statistics') or []:
+        if period.get('period') != 'ALL':
+            continue
+        for group in period.get('groups') or []:
+            for item in group.get('statisticsItems') or []:
+                for side in ('home', 'away'):
+                    value = item.get(f'{side}Value')
+                    if isinstance(value, (int, float)):
+                        values[f"stats.{item.get('name')}.{side}"] = value
+    return values
+
+_track_sources = {'odds': ('match_odds', _odds_values), 'statistics': ('match_statistics', _statistics_values)}
+
+class _Series:
+    '''Fixed-size ring buffers holding one match's samples: a float64 array of sample times and a float32 array
+    per numeric field, all sharing one write position. A sample is only written when some value changed, so
+    the series are step functions and quiet periods cost nothing.'''
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.times = array('d', [math.nan]) * capacity
+        self.columns = {}
+        self.head = 0
+        self.count = 0
+        self.last = None
+
+    def append(self, t: float, values: dict) -> bool:
+        if values == self.last:
+            return False
+        for name in values.keys() - self.columns.keys():
+            self.columns[name] = array('f', [math.nan]) * self.capacity
+        i = self.head
+        self.times[i] = t
+        for name, column in self.columns.items():
+            column[i] = values.get(name, math.nan)
+        self.head = (i + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.last = values
+        return True
+
+    def _order(self):
+        start = (self.head - self.count) % self.capacity
+        return (i % self.capacity for i in range(start, start + self.count))
+
+    def series(self, names: list) -> dict:
+        order = list(self._order())
+        return {'times': [self.times[i] for i in order],
+                'fields': {name: [None if math.isnan(self.columns[name][i]) else round(self.columns[name][i], 4) for i in order]
+                           for name in names}}
+
+    def summary(self, names: list) -> dict:
+        order = list(self._order())
+        result = {}
+        for name in names:
+            column = self.columns[name]
+            points = [(self.times[i], column[i]) for i in order if not math.isnan(column[i])]
+            if not points:
+                continue
+            values = [v for _, v in points]
+            result[name] = {
+                'open': round(values[0], 4), 'close': round(values[-1], 4),
+                'min': round(min(values), 4), 'max': round(max(values), 4),
+                'delta': round(values[-1] - values[0], 4),
+                'changes': sum(1 for a, b in zip(values, values[1:]) if a != b),
+                'first': points[0][0], 'last': points[-1][0],
+            }
+        return result
+
+    def nbytes(self) -> int:
+        return self.times.itemsize * len(self.times) + sum(c.itemsize * len(c) for c in self.columns.values())
+
+class _Tracker:
+    '''Opt-in sampler of the odds and statistics of chosen matches. One background task polls every tracked
+    match once per interval through the response cache, however many clients subscribed to it, and records
+    the numeric fields in a _Series. Sampling a match ends when its tracking window ends or it is known to be
+    finished; its series is kept until the last subscriber leaves or room is needed for a new match.'''
+
+    def __init__(self, interval: float, capacity: int, max_matches: int):
+        self.interval = interval
+        self.capacity = capacity
+        self.max_matches = max_matches
+        self.matches = {}
+        self.polls = 0
+        self._task = None
+
+    def subscribe(self, ids: list, kinds: list, hours: float):
+        for match_id in ids:
+            entry = self.matches.get(match_id)
+            if entry is None:
+                if len(self.matches) >= self.max_matches:
+                    done = next((k for k, e in self.matches.items() if not e['active']), None)
+                    if done is None:
+                        raise ValueError(f'already tracking {self.max_matches} matches (BASEBALLAPI_TRACK_MAX_MATCHES)')
+                    del self.matches[done]
+                entry = self.matches[match_id] = {'kinds': set(), 'subscribers': 0, 'until': 0, 'active': True,
+                                                  'error': None, 'series': _Series(self.capacity)}
+            entry['kinds'].update(kinds)
+            entry['subscribers'] += 1
+            entry['until'] = max(entry['until'], time.time() + hours * 3600)
+            entry['active'] = not _is_finished(match_id)
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run())
+
+    def unsubscribe(self, ids: list):
+        for match_id in ids:
+            entry = self.matches.get(match_id)
+            if entry is not None:
+                entry['subscribers'] -= 1
+                if entry['subscribers'] <= 0:
+                    del self.matches[match_id]
+
+    async def _run(self):
+        _speculative.set(True)
+        while any(entry['active'] for entry in self.matches.values()):
+            started = time.monotonic()
+            active = [(match_id, entry) for match_id, entry in self.matches.items() if entry['active']]
+            await asyncio.gather(*(self._sample(match_id, entry) for match_id, entry in active))
+            self.polls += 1
+            now = time.time()
+            for match_id, entry in active:
+                entry['active'] = now < entry['until'] and not _is_finished(match_id)
+            await asyncio.sleep(max(0, self.interval - (time.monotonic() - started)))
+
+    async def _sample(self, match_id: int, entry: dict):
+        values = {}
+        for kind in sorted(entry['kinds']):
+            name, parse = _track_sources[kind]
+            try:
+                values.update(parse(await _call(name, id=match_id)))
+                entry['error'] = None
+            except Exception as e:
+                entry['error'] = f'{type(e).__name__}: {e}'
+        if values:
+            entry['series'].append(time.time(), values)
+
+    def describe(self, match_id: int) -> dict:
+        entry = self.matches[match_id]
+        return {'id': match_id, 'series': sorted(entry['kinds']), 'subscribers': entry['subscribers'], 'active': entry['active'],
+                'samples': entry['series'].count, 'fields': len(entry['series'].columns),
+                'bytes': entry['series'].nbytes(), 'until': entry['until'], 'error': entry['error']}
+
+_tracker = _Tracker(_track_interval, _track_capacity, _track_max_matches)
+
+def _single_worker(tool: str):
+    '''Refuse tools whose state lives in one process when stateless workers may answer the next call.'''
+    if _workers > 1:
+        raise ValueError(f'{tool} keeps its state in one worker process and is not available with '
+                         f'BASEBALLAPI_WORKERS={_workers}; run a single worker to use it')
+
+@_tool()
+async def track_matches(ids: Annotated[List[int], Field(description='The IDs of the matches to sample.')],
+                        series: Annotated[List[Literal['odds', 'statistics']], Field(description='What to sample. Default: odds and statistics.')] = None,
+                        hours: Annotated[float, Field(description='How long to keep sampling, in hours. Default: 6')] = 6,
+                        stop: Annotated[bool, Field(description='Unsubscribe from the matches instead.')] = False) -> dict:
+    '''Start (or stop) sampling the odds and team statistics of baseball matches on a schedule, to follow line movement and in-game trends with match_series. One shared poll serves every subscriber; sampling ends when the last subscriber stops, the time is up or the match is finished.'''
+    _single_worker('track_matches')
+    if stop:
+        _tracker.unsubscribe(ids)
+    else:
+        _tracker.subscribe(ids, series or list(_track_sources), hours)
+    return {'interval': _tracker.interval, 'capacity': _tracker.capacity, 'polls': _tracker.polls,
+            'tracked': [_tracker.describe(match_id) for match_id in _tracker.matches]}
+
+@_tool()
+async def match_series(id: Annotated[int, Field(description='The ID of a match tracked with track_matches.')],
+                       fields: Annotated[List[str], Field(description='Field name prefixes to return, e.g. "odds.Full time" or "stats.Hits". Default: all fields.')] = None,
+                       summary: Annotated[bool, Field(description='Return open, close, min, max, delta and number of changes per field instead of the full series.')] = False) -> dict:
+    '''Get the sampled time series of a tracked match's odds (decimal prices per market and choice) and team statistics (home and away values), or their open/close/min/max/delta summary. Samples are recorded only when a value changed.'''
+    _single_worker('match_series')
+    if id not in _tracker.matches:
+        raise ValueError(f'match {id} is not tracked; call track_matches first')
+    data = _tracker.matches[id]['series']
+    names = sorted(name for name in data.columns if not fields or name.startswith(tuple(fields)))
+    if summary:
+        return {'id': id, 'samples': data.count, 'summary': data.summary(names)}
+    return {'id': id, 'samples': data.count, **data.series(names)}
+
+class _SamplingProfiler:
+    '''Low-overhead sampling profiler: a background thread periodically captures the stack of the thread
+    running the event loop and aggregates the samples as collapsed stacks (flame-graph input).'''
+
+    def __init__(self):
+        self.interval = 0.005
+        self.samples = 0
+        self.stacks = Counter()
+        self._target = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval: float):
+        if self.running:
+            return
+        self.interval = interval
+        self.samples = 0
+        self.stacks = Counter()
+        self._target = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='baseballapi-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            self.stacks[';'.join(f'{os.path.basename(f.filename)}:{f.name}' for f in stack)] += 1
+            self.samples += 1
+
+    def report(self, top: int) -> dict:
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return {
+            'running': self.running,
+            'interval_ms': self.interval * 1000,
+            'samples': self.samples,
+            'functions': [{'function': f, 'samples': n} for f, n in leaves.most_common(top)],
+            'stacks': [{'stack': s, 'samples': n} for s, n in self.stacks.most_common(top)],
+        }
+
+_profiler = _SamplingProfiler()
+_metrics.gauge('baseballapi_scheduler_waiting', 'Upstream calls waiting for a rate-limit token.', lambda: len(_scheduler._waiters))
+_metrics.gauge('baseballapi_cache_entries', 'Entries in the in-memory response cache.', lambda: len(_cache._entries))
+_metrics.gauge('baseballapi_cache_bytes', 'Body bytes held by the in-memory response cache.', lambda: _cache.bytes)
+_metrics.gauge('baseballapi_coalesced_requests', 'Requests served by joining an identical in-flight request.', lambda: _coalesced)
+
+@mcp.resource('baseballapi://metrics', name='metrics', mime_type='application/openmetrics-text')
+async def metrics() -> str:
+    '''Per-tool and per-endpoint latency histograms, sizes, status codes, cache results, retries and in-flight counts in OpenMetrics text format.'''
+    return _metrics.render()
+
+@mcp.custom_route('/metrics', methods=['GET'])
+async def _metrics_endpoint(request) -> PlainTextResponse:
+    '''The same metrics for Prometheus scrapers when serving over HTTP.'''
+    return PlainTextResponse(_metrics.render(), media_type='application/openmetrics-text; version=1.0.0; charset=utf-8')
+
+@_tool()
+async def diagnostics(trace: Annotated[bool, Field(description='Switch the per-call trace log (one JSON line per tool call with phase timings) on or off.')] = None,
+                      profiler: Annotated[Literal['start', 'stop', 'status'], Field(description='Start or stop the sampling profiler, or report its state.')] = None,
+                      interval_ms: Annotated[float, Field(description='Sampling interval of the profiler in milliseconds. Default: 5')] = 5,
+                      top: Annotated[int, Field(description='Number of hottest functions and stacks to report. Default: 20')] = 20) -> dict: 
+    '''Switch the per-call trace log and the sampling profiler on or off at runtime. Returns their state; the profiler report lists the hottest functions and stacks sampled so far.'''
+    global _trace_enabled
+    if trace is not None:
+        _trace_enabled = trace
+    if profiler == 'start':
+        _profiler.start(max(interval_ms, 0.1) / 1000)
+    elif profiler == 'stop':
+        _profiler.stop()
+    return {'trace': {'enabled': _trace_enabled, 'path': _trace_log or 'baseballapi-trace.jsonl'}, 'profiler': _profiler.report(top)}
+
+@_tool()
+async def cache_stats() -> dict:
+    '''Get hit, miss and eviction counters and current size of the response cache, and the state of prefetching and the slate warm-up.'''
+    stats = {'cache': _cache.stats(), 'ttl': _cache_ttl, 'coalesced': _coalesced, 'in_flight': len(_pending)}
+    if _store is not None:
+        stats['disk'] = _store.stats()
+    stats['images'] = _images.stats()
+    stats['search_index'] = {'entities': len(_entities)}
+    stats['match_store'] = _history.stats()
+    stats['prefetch'] = _prefetcher.stats()
+    stats['warmup'] = _warmer.stats()
+    return stats
+
+@_tool()
+async def upstream_stats() -> dict:
+    '''Get the state of the upstream rate limiter (available tokens, queued calls, 429s, retries and the remaining RapidAPI plan quota), the usage, latency and quota of each pooled API key and the circuit breaker of each endpoint group.'''
+    return {**_scheduler.stats(), 'keys': _keys.stats(), 'breakers': {group: b.stats() for group, b in _breakers.items()}}
+
+_transport = os.getenv('BASEBALLAPI_TRANSPORT', 'stdio')
+_host = os.getenv('BASEBALLAPI_HOST', '127.0.0.1')
 
+def _http_app():
+    '''ASGI app for the HTTP transports. uvicorn calls this factory once in every worker process; with several
+    workers the app is stateless, so any worker can answer any request of a session.'''
+    return mcp.http_app(transport=_transport, stateless_http=_workers > 1)
 
 if __name__ == '__main__':
-    import sys
     port = int(sys.argv[1]) if len(sys.argv) > 1 else 9997
-    mcp.run(transport="stdio")
+    if _transport == 'stdio':
+        mcp.run(transport='stdio')
+    elif _transport not in ('http', 'streamable-http', 'sse'):
+        raise SystemExit(f'Unknown BASEBALLAPI_TRANSPORT {_transport!r}; expected stdio, http or sse')
+    elif _workers > 1:
+        if _transport == 'sse':
+            raise SystemExit('The SSE transport keeps sessions in memory; use BASEBALLAPI_TRANSPORT=http with several workers')
+        # Workers import this module afresh and find the shared store through the environment.
+        os.environ.setdefault('BASEBALLAPI_CACHE_DB', os.path.join(tempfile.gettempdir(), f'baseballapi-{port}.db'))
+        uvicorn.run('server:_http_app', factory=True, host=_host, port=port, workers=_workers)
+    else:
+        uvicorn.run(_http_app(), host=_host, port=port)
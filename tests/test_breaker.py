@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    monkeypatch.setattr(server, '_breaker_min_calls', 4)
+    monkeypatch.setattr(server, '_breaker_failure_ratio', 0.5)
+    monkeypatch.setattr(server, '_breaker_cooldown', 0.05)
+    return server._CircuitBreaker('match')
+
+
+def trip(breaker):
+    for ok in (True, False, True, False):
+        assert breaker.enter() is False
+        breaker.record(ok, False)
+
+
+def test_opens_once_enough_recent_calls_failed(breaker):
+    for ok in (True, False, True):
+        breaker.enter()
+        breaker.record(ok, False)
+    assert breaker.state == 'closed'
+    breaker.enter()
+    breaker.record(False, False)
+    assert breaker.state == 'open'
+    with pytest.raises(server._Unavailable, match='match endpoints are failing'):
+        breaker.enter()
+    assert breaker.rejected == 1
+
+
+def test_calls_that_never_reached_upstream_do_not_count(breaker):
+    for _ in range(4):
+        breaker.enter()
+        breaker.record(None, False)
+    assert breaker.state == 'closed'
+    assert len(breaker.outcomes) == 0
+
+
+def test_half_open_probe_closes_the_breaker(breaker):
+    trip(breaker)
+    time.sleep(0.06)
+    assert breaker.available()
+    assert breaker.enter() is True
+    assert breaker.state == 'half_open'
+    # Only the probe goes through while it is running.
+    with pytest.raises(server._Unavailable):
+        breaker.enter()
+    breaker.record(True, True)
+    assert breaker.state == 'closed'
+    assert breaker.enter() is False
+
+
+def test_failed_probe_reopens_the_breaker(breaker):
+    trip(breaker)
+    time.sleep(0.06)
+    assert breaker.enter() is True
+    breaker.record(False, True)
+    assert breaker.state == 'open'
+    assert breaker.trips == 2
+    assert not breaker.available()
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+
+def test_prune_drops_rows_past_the_stale_window(tmp_path):
+    store = server._DiskStore(str(tmp_path / 'cache.db'), keep_stale=60)
+    store.put('fresh', b'{}', 30)
+    store.put('recent', b'{}', 30)
+    store.put('old', b'{}', 30)
+    store.put('final', b'{}')
+    store._db.execute("UPDATE responses SET expires_at = ? WHERE key = 'recent'", (time.time() - 30,))
+    store._db.execute("UPDATE responses SET expires_at = ? WHERE key = 'old'", (time.time() - 120,))
+
+    assert store.prune() == 1
+    keys = {row[0] for row in store._db.execute('SELECT key FROM responses')}
+    assert keys == {'fresh', 'recent', 'final'}
+
+
+def test_put_prunes_at_most_once_per_interval(tmp_path):
+    store = server._DiskStore(str(tmp_path / 'cache.db'), keep_stale=0, prune_interval=3600)
+    store.put('first', b'{}', 30)
+    store._db.execute('UPDATE responses SET expires_at = ?', (time.time() - 1,))
+    store.put('second', b'{}', 30)
+    assert store.get('first', 60) is not None
+
+    store._pruned_at = 0
+    store.put('third', b'{}', 30)
+    assert store.get('first', 60) is None
+
+
+def test_a_locked_store_does_not_block_the_event_loop(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    store = server._DiskStore(path)
+    other = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    other.execute('BEGIN IMMEDIATE')
+    threading.Timer(0.3, lambda: other.execute('COMMIT')).start()
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        delay = await store.run(store.take_token, 1, 1)
+        ticker.cancel()
+        return delay, ticks
+
+    delay, ticks = asyncio.run(main())
+    assert delay == 0
+    assert ticks >= 10
@@ -0,0 +1,50 @@
+import asyncio
+import json
+import math
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+MATCH = 8_000_001
+
+
+@pytest.fixture
+def upstream(monkeypatch, tmp_path):
+    def handler(request):
+        if request.url.path == f'/api/baseball/match/{MATCH}':
+            return httpx.Response(200, json={'event': {'id': MATCH, 'status': {'type': 'finished'}}})
+        return httpx.Response(200, json={'path': request.url.path})
+
+    keys = server._KeyPool(['key'], 0, 1)
+    monkeypatch.setattr(server, '_keys', keys)
+    monkeypatch.setattr(server, '_scheduler', server._Scheduler(0, 1, 0, keys))
+    monkeypatch.setattr(server, '_cache', server._ResponseCache(100, 1 << 20))
+    monkeypatch.setattr(server, '_store', server._DiskStore(str(tmp_path / 'cache.db')))
+    monkeypatch.setattr(server, '_finished_matches', set())
+    monkeypatch.setattr(server, '_client', httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def fetch(name: str) -> tuple:
+    endpoint = server._endpoints[name]
+    args = {'id': MATCH}
+    asyncio.run(server._get(endpoint, args))
+    return server._cache_key(endpoint.url(args), endpoint.query(args))
+
+
+def test_only_final_endpoints_become_immutable(upstream):
+    fetch('match_details')
+    assert server._is_finished(MATCH)
+    for name in ('match_details', 'match_lineups', 'match_highlights', 'match_votes', 'match_odds'):
+        key = fetch(name) if name != 'match_details' else server._cache_key(f'/api/baseball/match/{MATCH}', {})
+        expires = server._cache._entries[key][0]
+        row = server._store.get(json.dumps(key))
+        if name in ('match_details', 'match_lineups'):
+            assert math.isinf(expires) and row is not None and row[2] is None, name
+        else:
+            assert not math.isinf(expires), name
+            assert row is None or row[2] is not None, name
@@ -0,0 +1,79 @@
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+REQUEST = httpx.Request('GET', 'http://upstream/api/baseball/match/1')
+
+
+def response(status: int, **headers) -> httpx.Response:
+    return httpx.Response(status, headers=headers, json={}, request=REQUEST)
+
+
+def test_key_metrics_render_with_errors_and_statuses(monkeypatch):
+    metrics = server._Metrics(server._metric_families)
+    monkeypatch.setattr(server, '_metrics', metrics)
+    pool = server._KeyPool(['first-key'], 0, 1)
+    pool.release(pool.pick())
+    pool.release(pool.pick(), response(403), 0.1)
+    text = metrics.render()
+    assert 'baseballapi_key_requests_total{key="key1",status="403"} 1' in text
+    assert 'baseballapi_key_requests_total{key="key1",status="error"} 1' in text
+
+
+def test_429_benches_a_key_for_its_retry_after():
+    pool = server._KeyPool(['a', 'b'], 0, 1)
+    first = pool.pick()
+    pool.release(first, response(429, **{'retry-after': '30'}), 0.1)
+    assert 29 < first.benched_until - time.monotonic() <= 30
+    assert all(pool.pick() is not first for _ in range(20))
+    assert pool.benched_for() == 0
+
+
+def test_403_benches_a_key_and_everything_benched_falls_back(monkeypatch):
+    monkeypatch.setattr(server, '_key_bench_seconds', 300)
+    pool = server._KeyPool(['a', 'b'], 0, 1)
+    a, b = pool.keys
+    pool.release(pool.pick([b]), response(403), 0.1)
+    pool.release(pool.pick([a]), response(429, **{'retry-after': '5'}), 0.1)
+    assert a.forbidden == 1 and b.throttled == 1
+    assert pool.usable() == 0
+    assert 4 < pool.benched_for() <= 5
+    assert pool.pick() is b
+
+
+def test_exhausted_quota_takes_a_key_out_of_rotation():
+    pool = server._KeyPool(['a', 'b'], 0, 1)
+    a, b = pool.keys
+    pool.release(pool.pick([b]), response(200, **{'x-ratelimit-requests-limit': '100', 'x-ratelimit-requests-remaining': '0',
+                                                  'x-ratelimit-requests-reset': '3600'}), 0.1)
+    pool.release(pool.pick([a]), response(200, **{'x-ratelimit-requests-limit': '100', 'x-ratelimit-requests-remaining': '40',
+                                                  'x-ratelimit-requests-reset': '60'}), 0.1)
+    assert all(pool.pick() is b for _ in range(10))
+    limit, remaining, _ = pool.quota()
+    assert (limit, remaining) == (200, 40)
+
+
+def test_request_moves_to_another_key_after_429(monkeypatch):
+    pool = server._KeyPool(['a', 'b'], 0, 1)
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers['x-rapidapi-key'])
+        if len(seen) == 1:
+            return httpx.Response(429, headers={'retry-after': '60'}, json={})
+        return httpx.Response(200, json={'event': {'id': 1}})
+
+    monkeypatch.setattr(server, '_keys', pool)
+    monkeypatch.setattr(server, '_scheduler', server._Scheduler(0, 1, 0, pool))
+    monkeypatch.setattr(server, '_client', httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    started = time.monotonic()
+    result = asyncio.run(server._request(server._endpoints['match_details'], '/api/baseball/match/1', {}, server.PRIORITY_NORMAL))
+    assert result.status_code == 200
+    assert len(seen) == 2 and seen[0] != seen[1]
+    assert time.monotonic() - started < 1
@@ -0,0 +1,53 @@
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200, json={'results': [{'entity': {'id': 3636, 'name': 'New York Yankees', 'slug': 'new-york-yankees'},
+                                                      'score': 1, 'type': 'team'}]})
+
+    keys = server._KeyPool(['key'], 0, 1)
+    monkeypatch.setattr(server, '_keys', keys)
+    monkeypatch.setattr(server, '_scheduler', server._Scheduler(0, 1, 0, keys))
+    monkeypatch.setattr(server, '_cache', server._ResponseCache(100, 1 << 20))
+    monkeypatch.setattr(server, '_entities', server._EntityIndex())
+    monkeypatch.setattr(server, '_client', httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return calls
+
+
+def search(term: str) -> dict:
+    return asyncio.run(server._get(server._endpoints['search'], {'term': term}))
+
+
+def test_cached_upstream_answer_beats_the_local_index(upstream):
+    first = search('yankees')
+    second = search('yankees')
+    assert len(upstream) == 1
+    assert second['results'] == first['results']
+    assert second['_cache']['source'] == 'memory'
+
+
+def test_local_index_answers_a_miss(upstream):
+    search('yankees')
+    other = search('new york')
+    assert len(upstream) == 1
+    assert other['_cache']['source'] == 'local'
+    assert other['results'][0]['entity']['id'] == 3636
+
+
+def test_short_terms_go_upstream(upstream):
+    search('yankees')
+    search('n')
+    assert len(upstream) == 2
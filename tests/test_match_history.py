@@ -0,0 +1,59 @@
+import asyncio
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+
+def ts(text: str) -> int:
+    return int(datetime.strptime(text, '%Y-%m-%d %H:%M').replace(tzinfo=timezone.utc).timestamp())
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    '''Serve one page per walk direction, newest first for last matches and soonest first for next matches.'''
+    served = {
+        'next': [ts('2024-05-01 00:00'), ts('2024-05-01 23:00'), ts('2024-05-02 00:00')],
+        'previous': [ts('2024-05-01 23:00'), ts('2024-05-01 00:00'), ts('2024-04-30 23:59')],
+    }
+
+    def handler(request):
+        parts = request.url.path.split('/')
+        starts = served[parts[-2]] if parts[-1] == '0' else []
+        events = [{'id': i, 'startTimestamp': start} for i, start in enumerate(starts, 1)]
+        return httpx.Response(200, json={'events': events, 'hasNextPage': bool(events)})
+
+    keys = server._KeyPool(['key'], 0, 1)
+    monkeypatch.setattr(server, '_keys', keys)
+    monkeypatch.setattr(server, '_scheduler', server._Scheduler(0, 1, 0, keys))
+    monkeypatch.setattr(server, '_cache', server._ResponseCache(100, 1 << 20))
+    monkeypatch.setattr(server, '_client', httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def walk(source: str, until: str) -> dict:
+    from fastmcp import Client
+
+    async def run():
+        async with Client(server.mcp) as client:
+            result = await client.call_tool('match_history', {'source': source, 'id': 7, 'until': until})
+            return json.loads(result.content[0].text)
+
+    return asyncio.run(run())
+
+
+def test_next_matches_keep_the_whole_until_day(pages):
+    result = walk('team_next', '2024-05-01')
+    assert [e['id'] for e in result['events']] == [1, 2]
+    assert result['hasMore'] is False
+
+
+def test_last_matches_stop_before_the_until_day(pages):
+    result = walk('team_last', '2024-05-01')
+    assert [e['id'] for e in result['events']] == [1, 2]
+    assert result['hasMore'] is False
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+TEAM = 4242
+RIVAL = 4243
+
+
+def event(match_id: int, start: int) -> dict:
+    return {'id': match_id, 'startTimestamp': start, 'status': {'type': 'finished'},
+            'homeTeam': {'id': TEAM, 'name': 'Home'}, 'awayTeam': {'id': RIVAL, 'name': 'Away'},
+            'homeScore': {'current': 3}, 'awayScore': {'current': 1}}
+
+
+def ingest(store, page: int, data: dict, as_of: float = 1_000_000, started: float = None):
+    store.ingest(server._endpoints['team_last_matches'], {'id': TEAM, 'page': page}, data, as_of, started)
+
+
+def coverage(store):
+    return store.past.get(('team', TEAM))
+
+
+def test_pages_only_count_in_order():
+    store = server._MatchStore()
+    ingest(store, 0, {'events': [event(3, 300)], 'hasNextPage': True})
+    assert coverage(store)['since'] == 300
+    ingest(store, 2, {'events': [event(1, 100)], 'hasNextPage': True})
+    assert coverage(store)['since'] == 300
+    ingest(store, 1, {'events': [event(2, 200)], 'hasNextPage': True})
+    assert coverage(store)['since'] == 100
+    assert coverage(store)['next_page'] == 3
+
+
+def test_page_zero_answering_last():
+    store = server._MatchStore()
+    ingest(store, 2, {'events': [event(1, 100)], 'hasNextPage': True}, as_of=1001)
+    ingest(store, 1, {'events': [event(2, 200)], 'hasNextPage': True}, as_of=1002)
+    assert coverage(store) is None
+    ingest(store, 0, {'events': [event(3, 300)], 'hasNextPage': True}, as_of=1003, started=1000)
+    assert coverage(store)['since'] == 100
+    assert coverage(store)['next_page'] == 3
+
+
+def test_pages_received_before_page_zero_was_requested_do_not_count():
+    store = server._MatchStore()
+    ingest(store, 1, {'events': [event(2, 200)], 'hasNextPage': True}, as_of=900)
+    ingest(store, 0, {'events': [event(3, 300)], 'hasNextPage': True}, as_of=1003, started=1000)
+    assert coverage(store)['since'] == 300
+    ingest(store, 2, {'events': [event(1, 100)], 'hasNextPage': True}, as_of=950)
+    assert coverage(store)['next_page'] == 1
+    ingest(store, 1, {'events': [event(2, 200)], 'hasNextPage': True}, as_of=1010)
+    assert coverage(store)['since'] == 200
+
+
+def test_empty_last_page_covers_the_whole_history():
+    store = server._MatchStore()
+    ingest(store, 0, {'events': [event(3, 300)], 'hasNextPage': True})
+    ingest(store, 1, {'events': [], 'hasNextPage': False})
+    assert coverage(store)['since'] == 0
+
+
+def test_error_body_proves_nothing():
+    store = server._MatchStore()
+    ingest(store, 0, {'error': 'Forbidden'})
+    assert coverage(store) is None
+
+
+def test_error_page_is_not_ingested(monkeypatch):
+    def handler(request):
+        return httpx.Response(403, json={'message': 'You are not subscribed to this API.'})
+
+    monkeypatch.setattr(server, '_client', httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    with pytest.raises(RuntimeError, match='HTTP 403'):
+        asyncio.run(server._get(server._endpoints['team_last_matches'], {'id': TEAM, 'page': 0}))
+    assert coverage(server._history) is None
+    assert server._history.near(TEAM) is None
+
+
+def test_concurrent_walk_with_page_zero_answering_last(monkeypatch):
+    from fastmcp import Client
+
+    async def handler(request):
+        page = int(request.url.path.rsplit('/', 1)[1])
+        if page == 0:
+            await asyncio.sleep(0.05)
+        events = [event(10 + page, 1_600_000_000 - page * 86400)] if page < 3 else []
+        return httpx.Response(200, json={'events': events, 'hasNextPage': page < 3})
+
+    keys = server._KeyPool(['key'], 0, 1)
+    monkeypatch.setattr(server, '_keys', keys)
+    monkeypatch.setattr(server, '_scheduler', server._Scheduler(0, 1, 0, keys))
+    monkeypatch.setattr(server, '_history', server._MatchStore())
+    monkeypatch.setattr(server, '_client', httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    async def walk():
+        async with Client(server.mcp) as client:
+            await client.call_tool('match_history', {'source': 'team_last', 'id': TEAM, 'prefetch': 3})
+
+    asyncio.run(walk())
+    assert coverage(server._history)['since'] == 0
+    assert coverage(server._history)['next_page'] >= 4
@@ -0,0 +1,45 @@
+import asyncio
+import os
+import sys
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+
+def test_render_mixes_status_codes_and_exception_names():
+    metrics = server._Metrics(server._metric_families)
+    metrics.inc('baseballapi_upstream_requests', endpoint='match_details', status='ReadTimeout')
+    metrics.inc('baseballapi_upstream_requests', endpoint='match_details', status=200)
+    metrics.inc('baseballapi_upstream_requests', endpoint='match_details', status=200)
+    text = metrics.render()
+    assert 'baseballapi_upstream_requests_total{endpoint="match_details",status="200"} 2' in text
+    assert 'baseballapi_upstream_requests_total{endpoint="match_details",status="ReadTimeout"} 1' in text
+    assert text.endswith('# EOF\n')
+
+
+def test_render_escapes_label_values():
+    metrics = server._Metrics(server._metric_families)
+    metrics.inc('baseballapi_tool_calls', tool='a"b\\c\nd', outcome='ok')
+    assert 'tool="a\\"b\\\\c\\nd"' in metrics.render()
+
+
+def test_render_after_a_timeout_and_a_success(monkeypatch):
+    metrics = server._Metrics(server._metric_families)
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            raise httpx.ReadTimeout('timed out', request=request)
+        return httpx.Response(200, json={'event': {'id': 1}})
+
+    monkeypatch.setattr(server, '_metrics', metrics)
+    monkeypatch.setattr(server, '_backoff_base', 0.001)
+    monkeypatch.setattr(server, '_client', httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    endpoint = server._endpoints['match_details']
+    response = asyncio.run(server._request(endpoint, '/api/baseball/match/1', {}, server.PRIORITY_NORMAL))
+    assert response.status_code == 200
+    text = metrics.render()
+    assert 'status="ReadTimeout"' in text and 'status="200"' in text
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+
+@pytest.fixture
+def season(monkeypatch):
+    '''One team of three players; the statistics of player 2 are missing upstream.'''
+
+    def handler(request):
+        path = request.url.path
+        if path.endswith('/standings/total'):
+            return httpx.Response(200, json={'standings': [{'rows': [{'team': {'id': 10, 'name': 'Team'}}]}]})
+        if path.endswith('/players'):
+            return httpx.Response(200, json={'players': [{'player': {'id': i, 'name': f'P{i}'}} for i in (1, 2, 3)]})
+        if '/player/2/' in path:
+            return httpx.Response(404, json={'error': 'Not Found'})
+        return httpx.Response(200, json={'statistics': {'homeRuns': int(path.split('/')[4])}})
+
+    keys = server._KeyPool(['key'], 0, 1)
+    monkeypatch.setattr(server, '_keys', keys)
+    monkeypatch.setattr(server, '_scheduler', server._Scheduler(0, 1, 0, keys))
+    monkeypatch.setattr(server, '_cache', server._ResponseCache(100, 1 << 20))
+    monkeypatch.setattr(server, '_store', None)
+    monkeypatch.setattr(server, '_share_state', False)
+    monkeypatch.setattr(server, '_breakers', {})
+    monkeypatch.setattr(server, '_pending', {})
+    monkeypatch.setattr(server, '_player_stats', {})
+    monkeypatch.setattr(server, '_client', httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+
+def ingest():
+    from fastmcp import Client
+
+    async def run():
+        async with Client(server.mcp) as client:
+            result = await client.call_tool('player_stats_ingest', {'tournamentId': 1, 'seasonId': 2})
+            return json.loads(result.content[0].text)
+
+    return asyncio.run(run())
+
+
+def test_failed_players_are_counted(season):
+    result = ingest()
+    assert result['players'] == 2
+    assert result['failed'] == 1
+
+
+def test_an_open_breaker_aborts_the_ingest(season):
+    from fastmcp.exceptions import ToolError
+
+    breaker = server._breaker('player')
+    breaker.state, breaker.opened_at = 'open', time.monotonic()
+    with pytest.raises(ToolError, match='endpoints are failing'):
+        ingest()
+    assert server._player_stats == {}
@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+
+def project(data, *fields):
+    return server._project(data, server._compile_projection(fields))
+
+
+def test_wildcard_and_named_key_merge_in_objects():
+    data = {'a': {'id': 1, 'name': 'A', 'slug': 'a'}, 'b': {'id': 2, 'name': 'B'}}
+    assert project(data, '*.id', 'a.name') == {'a': {'id': 1, 'name': 'A'}, 'b': {'id': 2}}
+
+
+def test_wildcard_and_index_merge_in_lists():
+    data = [{'id': 1, 'name': 'A'}, {'id': 2, 'name': 'B'}]
+    assert project(data, '*.id', '0.name') == [{'id': 1, 'name': 'A'}, {'id': 2}]
+
+
+def test_whole_named_key_wins_over_wildcard_subtree():
+    data = {'a': {'id': 1, 'name': 'A'}, 'b': {'id': 2, 'name': 'B'}}
+    assert project(data, '*.id', 'a') == {'a': {'id': 1, 'name': 'A'}, 'b': {'id': 2}}
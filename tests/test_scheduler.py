@@ -0,0 +1,62 @@
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+
+def test_waiters_are_served_in_priority_order():
+    scheduler = server._Scheduler(50, 1, 0, server._KeyPool(['key'], 50, 1))
+    order = []
+
+    async def call(priority):
+        await scheduler.acquire(priority)
+        order.append(priority)
+
+    async def main():
+        await asyncio.gather(call(server.PRIORITY_BULK), call(server.PRIORITY_NORMAL),
+                             call(server.PRIORITY_BULK), call(server.PRIORITY_INTERACTIVE))
+
+    asyncio.run(main())
+    assert order == [server.PRIORITY_INTERACTIVE, server.PRIORITY_NORMAL, server.PRIORITY_BULK, server.PRIORITY_BULK]
+    assert scheduler.granted == 4
+
+
+def test_429_on_the_last_usable_key_pauses_every_call():
+    keys = server._KeyPool(['key'], 0, 1)
+    scheduler = server._Scheduler(0, 1, 0, keys)
+    response = httpx.Response(429, headers={'retry-after': '0.2'})
+    keys.release(keys.pick(), response, 0.01)
+    scheduler.observe(response)
+    assert scheduler.throttled == 1
+    assert 0.1 < scheduler.stats()['paused_for'] <= 0.2
+
+    async def main():
+        started = time.monotonic()
+        await scheduler.acquire(server.PRIORITY_INTERACTIVE)
+        return time.monotonic() - started
+
+    assert asyncio.run(main()) >= 0.15
+
+
+def test_429_with_another_usable_key_does_not_pause():
+    keys = server._KeyPool(['first', 'second'], 0, 1)
+    scheduler = server._Scheduler(0, 1, 0, keys)
+    response = httpx.Response(429, headers={'retry-after': '30'})
+    keys.release(keys.pick(), response, 0.01)
+    scheduler.observe(response)
+    assert scheduler.stats()['paused_for'] == 0
+
+
+def test_bulk_calls_stop_at_the_quota_reserve():
+    scheduler = server._Scheduler(0, 1, 10, server._KeyPool(['key'], 0, 1))
+    scheduler.quota_remaining, scheduler.quota_reset_at = 5, time.time() + 60
+
+    asyncio.run(scheduler.acquire(server.PRIORITY_INTERACTIVE))
+    with pytest.raises(server._Unavailable, match='quota exhausted'):
+        asyncio.run(scheduler.acquire(server.PRIORITY_BULK))
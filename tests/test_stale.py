@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import server
+
+
+@pytest.fixture
+def upstream(monkeypatch, tmp_path):
+    '''A fresh memory cache and a shared disk store in front of a counting mock upstream.'''
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(200, json={'version': len(calls)})
+
+    monkeypatch.setattr(server, '_cache', server._ResponseCache(100, 1 << 20))
+    monkeypatch.setattr(server, '_store', server._DiskStore(str(tmp_path / 'cache.db')))
+    monkeypatch.setattr(server, '_share_state', True)
+    monkeypatch.setattr(server, '_persistent_classes', tuple(server._cache_ttl))
+    monkeypatch.setattr(server, '_pending', {})
+    monkeypatch.setattr(server, '_breakers', {})
+    keys = server._KeyPool(['key'], 0, 1)
+    monkeypatch.setattr(server, '_keys', keys)
+    monkeypatch.setattr(server, '_scheduler', server._Scheduler(0, 1, 0, keys))
+    monkeypatch.setattr(server, '_client', httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+    return calls
+
+
+def expire(key: tuple, seconds_ago: float = 1):
+    '''Make the memory copy of key expire, and its disk row with it, as if its TTL had just run out.'''
+    expires, size, data, fetched = server._cache._entries[key]
+    server._cache._entries[key] = (time.monotonic() - seconds_ago, size, data, fetched - 3600)
+    server._store._db.execute('UPDATE responses SET stored_at = stored_at - 3600, expires_at = ? WHERE key = ?',
+                              (time.time() - seconds_ago, json.dumps(key)))
+
+
+def key_of(name: str, args: dict) -> tuple:
+    endpoint = server._endpoints[name]
+    return server._cache_key(endpoint.url(args), endpoint.query(args))
+
+
+async def get(name: str, **args):
+    return await server._get(server._endpoints[name], args)
+
+
+def test_fresher_shared_row_wins_over_an_expired_memory_copy(upstream):
+    async def run():
+        await get('team_details', id=1)
+        key = key_of('team_details', {'id': 1})
+        expire(key)
+        # Another worker refreshed the row a moment ago.
+        server._store.put(json.dumps(key), json.dumps({'version': 'other worker'}).encode(), 60)
+        return await get('team_details', id=1)
+
+    result = asyncio.run(run())
+    assert result['version'] == 'other worker'
+    assert result['_cache']['source'] == 'disk'
+    assert len(upstream) == 1
+
+
+def test_expired_copy_is_served_while_it_is_revalidated(upstream):
+    async def run():
+        await get('team_details', id=2)
+        expire(key_of('team_details', {'id': 2}))
+        stale = await get('team_details', id=2)
+        await asyncio.sleep(0.05)
+        return stale, await get('team_details', id=2)
+
+    stale, fresh = asyncio.run(run())
+    assert (stale['version'], stale['_cache']['source']) == (1, 'stale')
+    assert (fresh['version'], fresh['_cache']['source']) == (2, 'memory')
+    assert len(upstream) == 2
+
+
+def test_live_data_waits_for_the_refresh(upstream):
+    async def run():
+        await get('live_matches')
+        expire(key_of('live_matches', {}))
+        return await get('live_matches')
+
+    result = asyncio.run(run())
+    assert result['version'] == 2
+    assert result['_cache'].get('source') != 'stale'